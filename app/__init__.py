@@ -1,75 +1,149 @@
-from flask import Flask, render_template
-from flask_moment import Moment
-from flask_sqlalchemy import SQLAlchemy
-from flask_wtf.csrf import CSRFProtect
-from flask_migrate import Migrate
-
+'''
+Fyyur application factory
+
+Importing the package only defines the extension objects; create_app()
+builds a configured application. Heavy dependencies (Alembic, Babel,
+dateutil, the forms and controllers) are imported by create_app or on
+first use, and every application created gets its own configuration,
+engines, caches and background executor.
+'''
 import logging
 from logging import Formatter, FileHandler
-from dotenv import load_dotenv
-import dateutil.parser
-import babel
+from datetime import datetime
+from functools import lru_cache
 
-# Load environment variables
-load_dotenv()
+from flask import Flask, render_template
+from flask_sqlalchemy import SQLAlchemy
+from flask_wtf.csrf import CSRFProtect
 
-app = Flask(__name__)
+# Define database object to be imported by modules and controllers; bound
+# to each application by create_app
+db = SQLAlchemy()
 # Enable CSRF protection
-csrf = CSRFProtect(app)
-
-moment = Moment(app)
-
-# Configurations
-app.config.from_object('config')
-
-# Define database object to be imported by modules and controllers
-db = SQLAlchemy(app)
-migrate = Migrate(app, db)
+csrf = CSRFProtect()
 
 # ----------------------------------------------------------------------------#
 # Filters.
 # ----------------------------------------------------------------------------#
 
 
-def format_datetime(value, format='medium'):
-    date = dateutil.parser.parse(value)
-    if format == 'full':
-        format = "EEEE MMMM, d, y 'at' h:mma"
-    elif format == 'medium':
-        format = "EE MM, dd, y h:mma"
-    return babel.dates.format_datetime(date, format)
+DATETIME_FORMATS = {
+    'full': "EEEE MMMM, d, y 'at' h:mma",
+    'medium': "EE MM, dd, y h:mma",
+}
+
+
+@lru_cache(maxsize=None)
+def _datetime_pattern(format):
+    # Compiled Babel pattern and locale, built once per format
+    import babel
+    import babel.dates
+    pattern = DATETIME_FORMATS.get(format, format)
+    return babel.dates.parse_pattern(pattern), babel.Locale.parse(babel.dates.LC_TIME)
+
 
+@lru_cache(maxsize=4096)
+def _format_datetime(value, format):
+    pattern, locale = _datetime_pattern(format)
+    return pattern.apply(value, locale)
 
-app.jinja_env.filters['datetime'] = format_datetime
+
+def format_datetime(value, format='medium'):
+    # Accepts datetimes as well as the strings older callers pass in
+    if not isinstance(value, datetime):
+        import dateutil.parser
+        value = dateutil.parser.parse(value)
+    return _format_datetime(value, format)
 
 # ----------------------------------------------------------------------------#
 # Error Handlers
 # ----------------------------------------------------------------------------#
 
 
-@app.errorhandler(404)
 def not_found_error(error):
     return render_template('errors/404.html'), 404
 
 
-@app.errorhandler(500)
 def server_error(error):
     return render_template('errors/500.html'), 500
 
 # ----------------------------------------------------------------------------#
-# Register blueprint
+# Application factory
 # ----------------------------------------------------------------------------#
 
 
-from app.core.controllers import core_module as core  # noqa: E302
-
-app.register_blueprint(core)
-
-if not app.debug:
-    file_handler = FileHandler('error.log')
-    file_handler.setFormatter(Formatter(
-        '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'))
-    app.logger.setLevel(logging.INFO)
-    file_handler.setLevel(logging.INFO)
-    app.logger.addHandler(file_handler)
-    app.logger.info('errors')
+def create_app(config=None):
+    '''
+    Create and configure an application. `config` is a mapping of settings
+    that override the ones config.py reads from the environment.
+    '''
+    from dotenv import load_dotenv
+    from flask_migrate import Migrate
+    from flask_moment import Moment
+
+    # Load environment variables
+    load_dotenv()
+
+    app = Flask(__name__)
+
+    # Configurations
+    app.config.from_object('config')
+    app.config.update(config or {})
+    # Derived from the database, replica and pool settings, so they follow
+    # the overrides too
+    from config import engine_options, replica_binds
+    if 'SQLALCHEMY_BINDS' not in (config or {}):
+        app.config['SQLALCHEMY_BINDS'] = replica_binds(app.config)
+    if 'SQLALCHEMY_ENGINE_OPTIONS' not in (config or {}):
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+
+    csrf.init_app(app)
+    Moment(app)
+    db.init_app(app)
+    Migrate(app, db)
+
+    app.jinja_env.filters['datetime'] = format_datetime
+    app.register_error_handler(404, not_found_error)
+    app.register_error_handler(500, server_error)
+
+    # Database sessions, pooling, instrumentation and assets
+    from app.core.helpers.cache import init_caches
+    from app.core.helpers.instrumentation import init_instrumentation, init_query_budgets
+    from app.core.helpers.metrics import init_metrics
+    from app.core.helpers.unit_of_work import init_unit_of_work
+    from app.core.helpers.pooling import init_pooling
+    from app.core.helpers.replicas import init_read_replicas
+    from app.core.helpers.tasks import init_tasks
+    from app.core.helpers.assets import init_assets
+    from app.core.helpers.compression import init_compression
+
+    init_caches(app)
+    init_pooling(app, db)
+    # First registered, so it compresses the final response after the others
+    init_compression(app)
+    init_instrumentation(app)
+    init_metrics(app, db)
+    init_read_replicas(app, db)
+    init_unit_of_work(app)
+    # Runs before the unit of work commits
+    init_query_budgets(app)
+    init_tasks(app)
+    init_assets(app)
+
+    # Register blueprint
+    from app.core.controllers import core_module as core
+    from app.core import commands  # noqa: F401
+    from app.api.controllers import api_module as api
+
+    app.register_blueprint(core)
+    app.register_blueprint(api)
+
+    if not app.debug and not app.testing:
+        file_handler = FileHandler('error.log')
+        file_handler.setFormatter(Formatter(
+            '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'))
+        app.logger.setLevel(logging.INFO)
+        file_handler.setLevel(logging.INFO)
+        app.logger.addHandler(file_handler)
+        app.logger.info('errors')
+    return app
@@ -0,0 +1,143 @@
+import json
+from flask import (
+    current_app,
+    request,
+    Response,
+    stream_with_context,
+    Blueprint
+)
+
+from app.core.models import (
+    Venue,
+    Artist
+)
+from app.core.helpers.database import DBApi
+
+api_module = Blueprint('api', __name__, url_prefix='/api/v1')
+
+
+def _dumps(value):
+    return json.dumps(value, default=lambda obj: obj.isoformat())
+
+
+def _json_response(value, status=200):
+    return Response(_dumps(value), status=status, mimetype='application/json')
+
+
+def _error(message, status):
+    return _json_response({'error': message}, status)
+
+
+def _fields():
+    # ?fields=id,name limits each item to the listed keys
+    fields = request.args.get('fields')
+    if not fields:
+        return None
+    return [field.strip() for field in fields.split(',') if field.strip()]
+
+
+def _select(item, fields):
+    if fields is None:
+        return item
+    return {key: item[key] for key in fields if key in item}
+
+
+def _limit():
+    limit = request.args.get('limit', current_app.config['PAGE_SIZE'], type=int)
+    return max(1, min(limit, current_app.config['API_MAX_PAGE_SIZE']))
+
+
+def _venue_items(page):
+    # The directory groups venues by area; the API lists them flat
+    return [
+        dict(venue, city=area['city'], state=area['state'])
+        for area in page['data'] for venue in area['venues']
+    ]
+
+
+def _collection(fetch, items=lambda page: page['data']):
+    '''
+    Respond with one page of a keyset-paginated DBApi collection, or with
+    ?stream=true the whole collection as a JSON array written page by page,
+    so only one page is held in memory at a time.
+    '''
+    fields = _fields()
+    limit = _limit()
+    cursor = request.args.get('cursor')
+    if request.args.get('stream', '').lower() not in ('1', 'true', 'yes'):
+        page = fetch(cursor=cursor, limit=limit)
+        return _json_response({
+            'data': [_select(item, fields) for item in items(page)],
+            'next_cursor': page['next_cursor']
+        })
+
+    # Fetch the first page up front so that a bad cursor is still reported
+    # with an error status rather than in the middle of a 200 response.
+    first_page = fetch(cursor=cursor, limit=limit)
+
+    def generate():
+        page = first_page
+        separator = '['
+        while True:
+            for item in items(page):
+                yield separator + _dumps(_select(item, fields))
+                separator = ','
+            if not page['next_cursor']:
+                break
+            page = fetch(cursor=page['next_cursor'], limit=limit)
+        yield '[]' if separator == '[' else ']'
+
+    return Response(
+        stream_with_context(generate()), mimetype='application/json')
+
+
+@api_module.errorhandler(ValueError)
+def bad_request(error):
+    return _error(str(error.args[0]) if error.args else 'Bad request', 400)
+
+
+@api_module.route('/venues')
+def venues():
+    return _collection(DBApi.get_venues, _venue_items)
+
+
+@api_module.route('/venues/<int:venue_id>')
+def venue(venue_id):
+    data = DBApi.get_by_id(Venue, venue_id)
+    if data is None:
+        return _error('Venue not found', 404)
+    return _json_response(_select(data, _fields()))
+
+
+@api_module.route('/venues/search')
+def search_venues():
+    search_term = request.args.get('search_term', '')
+    return _collection(
+        lambda cursor, limit: DBApi.search_venues_or_artists(
+            Venue, search_term, cursor=cursor, limit=limit))
+
+
+@api_module.route('/artists')
+def artists():
+    return _collection(DBApi.get_artists)
+
+
+@api_module.route('/artists/<int:artist_id>')
+def artist(artist_id):
+    data = DBApi.get_by_id(Artist, artist_id)
+    if data is None:
+        return _error('Artist not found', 404)
+    return _json_response(_select(data, _fields()))
+
+
+@api_module.route('/artists/search')
+def search_artists():
+    search_term = request.args.get('search_term', '')
+    return _collection(
+        lambda cursor, limit: DBApi.search_venues_or_artists(
+            Artist, search_term, cursor=cursor, limit=limit))
+
+
+@api_module.route('/shows')
+def shows():
+    return _collection(DBApi.get_shows)
@@ -0,0 +1,107 @@
+from datetime import datetime
+
+import click
+from flask import current_app
+
+from app.core.controllers import core_module
+from app.core.models import Venue, Artist
+from app.core.helpers.assets import build_assets
+from app.core.helpers.database import DBApi
+from app.core.helpers.explain import explain
+from app.core.helpers.importer import BulkImporter, BulkImportError
+
+
+def _index_checks():
+    # (description, query, index expected to back it)
+    booking_start = datetime(2030, 1, 1)
+    booking_end = datetime(2030, 6, 30)
+    return [
+        ('City lookup by lower(name) and state',
+         DBApi.city_query('San Francisco', 1),
+         'ix_city_lower_name_state_id'),
+        ('Address lookup by lower(street), house number and city',
+         DBApi.address_query(1, 'Main Street', 1),
+         'ix_address_lower_street_house_number_city_id'),
+        ('Shows for a venue',
+         DBApi.shows_query(Venue, 1),
+         'ix_show_venue_id_start_time'),
+        ('Shows for an artist',
+         DBApi.shows_query(Artist, 1),
+         'ix_show_artist_id_start_time'),
+        ('Booking conflicts of a venue',
+         DBApi.show_conflicts_query(1, 1, booking_start, booking_end),
+         'ix_show_venue_id_start_time'),
+        ('Booking conflicts of an artist',
+         DBApi.show_conflicts_query(1, 1, booking_start, booking_end),
+         'ix_show_artist_id_start_time'),
+        ('Venues of a city for availability',
+         DBApi.available_venues_query(1, booking_start.date(), 1),
+         'ix_address_city_id_venue_id'),
+        ('Shows on the day for availability',
+         DBApi.available_venues_query(1, booking_start.date(), 1),
+         'ix_show_venue_id_start_time'),
+    ]
+
+
+@core_module.cli.command('explain')
+@click.option('--verbose', '-v', is_flag=True, help='Print the full query plans.')
+def explain_command(verbose):
+    '''Verify that the DBApi lookup queries use their indexes.'''
+    failed = False
+    for description, query, index_name in _index_checks():
+        plan = explain(query)
+        used = any(index_name in line for line in plan)
+        failed = failed or not used
+        click.echo('[{}] {} ({})'.format(
+            'ok' if used else 'MISSING', description, index_name))
+        if verbose or not used:
+            for line in plan:
+                click.echo('    ' + line)
+    if failed:
+        raise click.ClickException('Some queries do not use their indexes.')
+
+
+@core_module.cli.command('roll-show-counts')
+@click.option('--rebuild', is_flag=True,
+              help='Recompute the counts of every venue and artist.')
+def roll_show_counts_command(rebuild):
+    '''Move started shows from the upcoming to the past show counts.'''
+    updated = DBApi.roll_show_counts(rebuild=rebuild)
+    click.echo('Refreshed show counts of {} venues and artists.'.format(updated))
+
+
+@core_module.cli.command('purge-deleted')
+def purge_deleted_command():
+    '''Remove soft-deleted venues and artists along with their shows.'''
+    purged = DBApi.purge_deleted()
+    click.echo('Removed {} venues and artists.'.format(purged))
+
+
+@core_module.cli.command('import')
+@click.argument('kind', type=click.Choice(['venues', 'artists', 'shows']))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--batch-size', default=500, show_default=True,
+              help='Records inserted and committed per batch.')
+@click.option('--restart', is_flag=True,
+              help='Ignore earlier progress and import from the first record.')
+def import_command(kind, path, batch_size, restart):
+    '''Bulk import venues, artists or shows from a CSV or NDJSON file.
+
+    Progress is committed along with every batch, so running the same
+    command again after a failure resumes where it stopped.
+    '''
+    importer = BulkImporter(kind, batch_size=batch_size, report=click.echo)
+    try:
+        importer.run(path, restart=restart)
+    except BulkImportError as error:
+        raise click.ClickException(
+            '{} Fix the file and run the command again to resume.'.format(error))
+
+
+@core_module.cli.command('build-assets')
+def build_assets_command():
+    '''Write fingerprinted, precompressed static assets and their manifest.'''
+    build_dir = current_app.config['ASSETS_BUILD_DIR']
+    manifest = build_assets(current_app.static_folder, build_dir)
+    click.echo('Built {} assets in {}; restart the app to serve them.'.format(
+        len(manifest), build_dir))
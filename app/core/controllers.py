@@ -1,4 +1,5 @@
 import json
+from datetime import datetime
 from flask import (
     render_template,
     request,
@@ -6,8 +7,16 @@ from flask import (
     flash,
     redirect,
     url_for,
+    abort,
+    session,
+    current_app,
+    make_response,
     Blueprint
 )
+from markupsafe import Markup
+from sqlalchemy import exc
+from werkzeug.exceptions import HTTPException
+from werkzeug.http import is_resource_modified
 
 from app import csrf
 from app.core.models import (
@@ -21,6 +30,7 @@ from app.core.forms import (
 )
 
 from app.core.helpers.database import DBApi
+from app.core.helpers.cache import detail_pages
 
 core_module = Blueprint('core', __name__, url_prefix='/')
 
@@ -30,17 +40,76 @@ def index():
     return render_template('pages/home.html')
 
 
+def _render_detail(cls, _id):
+    # Renders the venue/artist detail page, answering conditional GETs with
+    # 304 and reusing the rendered page body while the entity is unchanged.
+    # Only the body is cached: the layout carries the CSRF token and
+    # flashed messages.
+    kind = cls.__name__.lower()
+
+    def render():
+        data = DBApi.get_by_id(cls, _id)
+        if data is None:
+            abort(404)
+        return data, render_template(
+            'pages/_{}_detail.html'.format(kind), **{kind: data})
+
+    try:
+        version = DBApi.get_version(cls, _id)
+        if version is None:
+            abort(404)
+        updated_at, next_show_time, upcoming, past = version
+        # Shows are split into upcoming and past at render time, so once
+        # the next show has started the version is stale until
+        # roll-show-counts moves it.
+        if next_show_time is not None and next_show_time <= datetime.now():
+            data, body = render()
+            return render_template(
+                'pages/show_{}.html'.format(kind), detail=Markup(body), **{kind: data})
+
+        # No Last-Modified: its whole seconds can't tell apart two edits
+        # made within the same second
+        etag = '{}-{}-{}-{}-{}-{}'.format(
+            kind, _id, updated_at.timestamp(),
+            next_show_time.timestamp() if next_show_time else '', upcoming, past)
+        if '_flashes' not in session and not is_resource_modified(
+                request.environ, etag=etag):
+            response = Response(status=304)
+        else:
+            data, body = detail_pages().get(
+                (kind, _id), tuple(version), render,
+                current_app.config['DETAIL_PAGE_CACHE_SIZE'])
+            response = make_response(render_template(
+                'pages/show_{}.html'.format(kind), detail=Markup(body), **{kind: data}))
+    except (HTTPException, exc.TimeoutError):
+        raise
+    except Exception:
+        flash('Oops something went wrong.', 'error')
+        return render_template('pages/home.html')
+    response.set_etag(etag, weak=True)
+    # Always revalidate; pages embed a per-session CSRF token
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
 #  Venues
 #  ----------------------------------------------------------------
 
 @core_module.route('/venues')
 def venues():
     try:
-        data = DBApi.get_venues()
+        data = DBApi.get_venues(cursor=request.args.get('cursor'))
+    except exc.TimeoutError:
+        raise
     except Exception:
         flash('Oops something went wrong.', 'error')
         return render_template('pages/home.html')
-    return render_template('pages/venues.html', areas=data, count=len(data))
+    return render_template(
+        'pages/venues.html',
+        areas=data['data'],
+        count=len(data['data']),
+        next_cursor=data['next_cursor'])
 
 
 @core_module.route('/venues/search', methods=['POST'])
@@ -48,7 +117,10 @@ def search_venues():
     # search on venues with partial string search.
     search_term = request.form.get('search_term', '')
     try:
-        response = DBApi.search_venues_or_artists(Venue, search_term)
+        response = DBApi.search_venues_or_artists(
+            Venue, search_term, cursor=request.form.get('cursor'))
+    except exc.TimeoutError:
+        raise
     except Exception:
         flash('Oops something went wrong.', 'error')
         return render_template('pages/home.html')
@@ -58,15 +130,45 @@ def search_venues():
         search_term=search_term)
 
 
-@core_module.route('/venues/<int:venue_id>', methods=['GET'])
-def show_venue(venue_id):
-    # shows the venue page with the given venue_id
+@core_module.route('/venues/availability')
+def venue_availability():
+    # venues of a city, optionally with a genre, that are free on a date
+    search = {
+        key: request.args.get(key, '').strip()
+        for key in ('city', 'state', 'genre', 'date')
+    }
+    results = None
     try:
-        data = DBApi.get_by_id(Venue, venue_id)
+        genre_choices = DBApi.get_genres()
+        state_choices = DBApi.get_states()
+        if search['city'] and search['state'] and search['date']:
+            try:
+                day = datetime.strptime(search['date'], '%Y-%m-%d').date()
+            except ValueError:
+                raise ValueError('Invalid date supplied. Expected format - YYYY-MM-DD')
+            results = DBApi.find_available_venues(
+                search['city'], search['state'], day,
+                genre=search['genre'] or None,
+                cursor=request.args.get('cursor'))
+    except ValueError as error:
+        flash(error.args[0], 'error')
+    except exc.TimeoutError:
+        raise
     except Exception:
         flash('Oops something went wrong.', 'error')
         return render_template('pages/home.html')
-    return render_template('pages/show_venue.html', venue=data)
+    return render_template(
+        'pages/venue_availability.html',
+        search=search,
+        results=results,
+        genres=genre_choices,
+        states=state_choices)
+
+
+@core_module.route('/venues/<int:venue_id>', methods=['GET'])
+def show_venue(venue_id):
+    # shows the venue page with the given venue_id
+    return _render_detail(Venue, venue_id)
 
 #  Create Venue
 #  ----------------------------------------------------------------
@@ -78,6 +180,8 @@ def create_venue_form():
     try:
         form.genres.choices = DBApi.get_genres()
         form.state.choices = DBApi.get_states()
+    except exc.TimeoutError:
+        raise
     except Exception:
         flash('Oops something went wrong', 'error')
     return render_template('forms/new_venue.html', form=form)
@@ -96,6 +200,8 @@ def create_venue_submission():
         for error in form.errors:
             error_message = str(form.errors[error][0])
             flash(error.capitalize().replace('_', ' ') + ' - ' + error_message.strip('(\'.,)'), 'error')
+    except exc.TimeoutError:
+        raise
     except Exception as e:
         flash('An error occurred. Venue ' + form.name.data + ' could not be listed.', 'error')
     return render_template('forms/new_venue.html', form=form)
@@ -106,6 +212,8 @@ def create_venue_submission():
 def delete_venue(venue_id):
     try:
         DBApi.delete_venue(venue_id)
+    except exc.TimeoutError:
+        raise
     except Exception:
         flash('An error occurred. \nUnable to delete venue!', 'error')
     return render_template('pages/home.html')
@@ -116,11 +224,17 @@ def delete_venue(venue_id):
 @core_module.route('/artists')
 def artists():
     try:
-        data = DBApi.get_artists()
+        data = DBApi.get_artists(cursor=request.args.get('cursor'))
+    except exc.TimeoutError:
+        raise
     except Exception:
         flash('Oops something went wrong.', 'error')
         return render_template('pages/home.html')
-    return render_template('pages/artists.html', artists=data, count=len(data))
+    return render_template(
+        'pages/artists.html',
+        artists=data['data'],
+        count=len(data['data']),
+        next_cursor=data['next_cursor'])
 
 
 @core_module.route('/artists/search', methods=['POST'])
@@ -128,7 +242,10 @@ def search_artists():
     # Search on artists with partial string search.
     search_term = request.form.get('search_term', '')
     try:
-        response = DBApi.search_venues_or_artists(Artist, search_term)
+        response = DBApi.search_venues_or_artists(
+            Artist, search_term, cursor=request.form.get('cursor'))
+    except exc.TimeoutError:
+        raise
     except Exception:
         flash('Oops something went wrong.', 'error')
         return render_template('pages/home.html')
@@ -141,12 +258,19 @@ def search_artists():
 @core_module.route('/artists/<int:artist_id>')
 def show_artist(artist_id):
     # shows the artist page with the given artist_id
+    return _render_detail(Artist, artist_id)
+
+
+@core_module.route('/artists/<int:artist_id>', methods=['DELETE'])
+@csrf.exempt
+def delete_artist(artist_id):
     try:
-        data = DBApi.get_by_id(Artist, artist_id)
+        DBApi.delete_artist(artist_id)
+    except exc.TimeoutError:
+        raise
     except Exception:
-        flash('Oops something went wrong.', 'error')
-        return render_template('pages/home.html')
-    return render_template('pages/show_artist.html', artist=data)
+        flash('An error occurred. \nUnable to delete artist!', 'error')
+    return render_template('pages/home.html')
 
 
 #  Update
@@ -157,9 +281,13 @@ def edit_artist(artist_id):
         artist = DBApi.get_by_id(Artist, artist_id)
         genre_choices = DBApi.get_genres()
         state_choices = DBApi.get_states()
+    except exc.TimeoutError:
+        raise
     except Exception:
         flash('Oops something went wrong.', 'error')
         return render_template('pages/home.html')
+    if artist is None:
+        abort(404)
     # Prepare the form for editing
     form = ArtistForm()
     form.genres.choices = genre_choices
@@ -195,6 +323,8 @@ def edit_artist_submission(artist_id):
             flash(
                 error.capitalize().replace('_', ' ') + ' - ' + error_message.strip('(\'.,)'), 'error'
             )
+    except exc.TimeoutError:
+        raise
     except Exception:
         flash('An error occurred. Artist ' + form.name.data + ' could not be updated.', 'error')
 
@@ -209,9 +339,13 @@ def edit_venue(venue_id):
         venue = DBApi.get_by_id(Venue, venue_id)
         genre_choices = DBApi.get_genres()
         state_choices = DBApi.get_states()
+    except exc.TimeoutError:
+        raise
     except Exception:
         flash('Oops something went wrong.', 'error')
         return render_template('pages/home.html')
+    if venue is None:
+        abort(404)
     # Prepare the form for editing
     form = VenueForm()
     form.genres.choices = genre_choices
@@ -246,6 +380,8 @@ def edit_venue_submission(venue_id):
             flash(
                 error.capitalize().replace('_', ' ') + ' - ' + error_message.strip('(\'.,)'), 'error'
             )
+    except exc.TimeoutError:
+        raise
     except Exception as e:
         flash('An error occurred. Venue ' + form.name.data + ' could not be updated.', 'error')
     venue = dict(request.form)
@@ -278,6 +414,8 @@ def create_artist_submission():
         for error in form.errors:
             error_message = str(form.errors[error][0])
             flash(error.capitalize().replace('_', ' ') + ' - ' + error_message.strip('(\'.,)'), 'error')
+    except exc.TimeoutError:
+        raise
     except Exception:
         flash('An error occurred. Artist ' + form.name.data + ' could not be listed.', 'error')
     return render_template('forms/new_artist.html', form=form)
@@ -290,11 +428,28 @@ def create_artist_submission():
 def shows():
     # displays list of shows at /shows
     try:
-        data = DBApi.get_shows()
+        data = DBApi.get_shows(cursor=request.args.get('cursor'))
+    except exc.TimeoutError:
+        raise
     except Exception:
         flash('Oops something went wrong.', 'error')
         return render_template('pages/home.html')
-    return render_template('pages/shows.html', shows=data)
+    return render_template(
+        'pages/shows.html',
+        shows=data['data'],
+        next_cursor=data['next_cursor'])
+
+
+@core_module.route('/shows/<int:show_id>', methods=['DELETE'])
+@csrf.exempt
+def delete_show(show_id):
+    try:
+        DBApi.delete_show(show_id)
+    except exc.TimeoutError:
+        raise
+    except Exception:
+        flash('An error occurred. \nUnable to delete show!', 'error')
+    return render_template('pages/home.html')
 
 
 @core_module.route('/shows/create')
@@ -310,8 +465,11 @@ def create_show_submission():
     try:
         form = ShowForm(request.form)
         if form.validate():
-            DBApi.create_show(form)
-            flash('Show was successfully listed!')
+            booked = DBApi.create_show(form)
+            if booked == 1:
+                flash('Show was successfully listed!')
+            else:
+                flash('{} shows were successfully listed!'.format(booked))
             return render_template('pages/home.html')
         for error in form.errors:
             error_message = str(form.errors[error][0])
@@ -319,6 +477,8 @@ def create_show_submission():
     except ValueError as error:
         error_message = error.args[0].strip('(\'.,)')
         flash(error_message, 'error')
+    except exc.TimeoutError:
+        raise
     except Exception:
         flash('An error occurred. Show could not be listed.', 'error')
     return render_template('forms/new_show.html', form=form)
@@ -1,9 +1,11 @@
-from datetime import datetime
+from datetime import datetime, time
+from itertools import islice
 from flask_wtf import Form
 from wtforms import (
     StringField,
     SelectField,
     SelectMultipleField,
+    DateField,
     DateTimeField,
     ValidationError,
     IntegerField,
@@ -14,6 +16,7 @@ from wtforms.validators import (
     AnyOf,
     URL,
     Length,
+    NumberRange,
     Optional)
 import phonenumbers
 
@@ -62,6 +65,56 @@ class ShowForm(Form):
         validators=[DataRequired(), validate_start_time],
         default=datetime.today()
     )
+    # Optional recurrence, expanded into one show per occurrence
+    repeat = SelectField(
+        'repeat', default='',
+        choices=[
+            ('', 'Does not repeat'),
+            ('daily', 'Daily'),
+            ('weekly', 'Weekly'),
+            ('monthly', 'Monthly')
+        ]
+    )
+    interval = IntegerField(
+        'interval', default=1,
+        validators=[Optional(), NumberRange(min=1)]
+    )
+    until = DateField(
+        'until', validators=[Optional()]
+    )
+    occurrences = IntegerField(
+        'occurrences', validators=[Optional(), NumberRange(min=1)]
+    )
+
+    def validate_repeat(form, field):
+        if field.data and not (form.until.data or form.occurrences.data):
+            raise ValidationError(
+                'A recurring show needs an end date or a number of occurrences')
+
+    def validate_until(form, field):
+        # Such a recurrence would not book a single show; an unparsable
+        # date is reported by the DateField itself
+        start_time, until = form.start_time.data, field.data
+        if form.repeat.data and start_time and until and until < start_time.date():
+            raise ValidationError('The end date is before the first show')
+
+    def start_times(self, limit):
+        # Start times of every show to book, at most `limit` of them
+        if not self.repeat.data:
+            return [self.start_time.data]
+        from dateutil.rrule import rrule, DAILY, WEEKLY, MONTHLY
+        until = self.until.data
+        rule = rrule(
+            {'daily': DAILY, 'weekly': WEEKLY, 'monthly': MONTHLY}[self.repeat.data],
+            dtstart=self.start_time.data,
+            interval=self.interval.data or 1,
+            until=datetime.combine(until, time.max) if until else None)
+        count = min(self.occurrences.data or limit + 1, limit + 1)
+        start_times = list(islice(rule, count))
+        if len(start_times) > limit:
+            raise ValueError(
+                'A recurring booking can create at most {} shows'.format(limit))
+        return start_times
 
 
 class VenueForm(Form):
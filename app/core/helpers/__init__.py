@@ -6,6 +6,7 @@ from app.core.models import (
     City,
     State,
     Address,
+    ImportProgress,
     show,
     genre_artist,
     genre_venue
@@ -0,0 +1,161 @@
+'''
+Fingerprinted, precompressed static assets
+
+`flask core build-assets` copies every file of app/static to
+ASSETS_BUILD_DIR under a name carrying a hash of its content
+(css/main.css -> css/main.3f2a9c1b07d4.css), adds the minified layout CSS
+bundles, writes gzip and brotli variants of text files next to them and
+records the names in manifest.json. Builds only add files, so pages
+rendered before a deploy keep finding the assets they link to.
+
+When the app starts with a manifest, url_for('static', filename=...)
+returns the fingerprinted URL. Those URLs are served from the build with
+a year-long immutable Cache-Control, in the best encoding the client
+accepts, so repeat visits don't ask for them again. Without a build the
+static files are served as before.
+'''
+import gzip
+import hashlib
+import io
+import json
+import mimetypes
+import os
+import re
+
+from flask import request, safe_join, send_file, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:  # gzip variants only
+    brotli = None
+
+
+MANIFEST = 'manifest.json'
+FINGERPRINTED = re.compile(r'\.[0-9a-f]{12}\.\w+$')
+
+# Stylesheets served as one minified file once built, in cascade order
+BUNDLES = {
+    'css/layout.min.css': [
+        'css/layout.main.css',
+        'css/main.css',
+        'css/main.responsive.css',
+        'css/main.quickfix.css',
+    ],
+}
+
+COMPRESSIBLE = ('.css', '.js', '.map', '.svg', '.eot', '.ttf', '.otf')
+# Smaller files don't gain enough to be worth a variant
+MIN_COMPRESS_SIZE = 512
+
+
+def minify_css(css):
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r' ?([{};,>]) ?', r'\1', css)
+    css = re.sub(r': ', ':', css)
+    return css.replace(';}', '}').strip()
+
+
+def fingerprint(name, content):
+    root, extension = os.path.splitext(name)
+    return '{}.{}{}'.format(root, hashlib.sha256(content).hexdigest()[:12], extension)
+
+
+def _gzip(content):
+    # A fixed mtime keeps the output identical between builds
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb', compresslevel=9, mtime=0) as file:
+        file.write(content)
+    return buffer.getvalue()
+
+
+def _write(directory, name, content):
+    path = os.path.join(directory, *name.split('/'))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as file:
+        file.write(content)
+
+
+def build_assets(static_folder, build_dir):
+    '''
+    Build the fingerprinted assets and their manifest; returns the
+    manifest's {name: fingerprinted name} mapping.
+    '''
+    files = {}
+    for root, _, names in os.walk(static_folder):
+        for name in names:
+            if name.startswith('.'):
+                continue
+            path = os.path.join(root, name)
+            with open(path, 'rb') as file:
+                files[os.path.relpath(path, static_folder).replace(os.sep, '/')] = file.read()
+    for bundle, sources in BUNDLES.items():
+        files[bundle] = minify_css('\n'.join(
+            files[source].decode('utf-8') for source in sources)).encode('utf-8')
+
+    manifest = {}
+    for name, content in sorted(files.items()):
+        built = fingerprint(name, content)
+        _write(build_dir, built, content)
+        if name.endswith(COMPRESSIBLE) and len(content) >= MIN_COMPRESS_SIZE:
+            _write(build_dir, built + '.gz', _gzip(content))
+            if brotli is not None:
+                _write(build_dir, built + '.br', brotli.compress(content))
+        manifest[name] = built
+    _write(build_dir, MANIFEST, json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    return manifest
+
+
+def _send_built(build_dir, filename, max_age):
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+        path = safe_join(build_dir, filename + suffix)
+        if encoding in request.accept_encodings and os.path.isfile(path):
+            response = send_file(
+                path, mimetype=mimetype, conditional=True, cache_timeout=max_age)
+            response.headers['Content-Encoding'] = encoding
+            break
+    else:
+        response = send_from_directory(
+            build_dir, filename, mimetype=mimetype, cache_timeout=max_age)
+    response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] += ', immutable'
+    return response
+
+
+def init_assets(app):
+    '''
+    Point url_for('static', ...) at the fingerprinted build when one exists
+    and add the asset_urls() template helper for stylesheet bundles.
+    '''
+    build_dir = app.config['ASSETS_BUILD_DIR']
+    manifest = {}
+    path = os.path.join(build_dir, MANIFEST)
+    if app.config['ASSETS_FINGERPRINT'] and os.path.isfile(path):
+        with open(path) as file:
+            manifest = json.load(file)
+
+    def asset_urls(bundle):
+        # The bundle once built, its source files otherwise
+        names = [bundle] if bundle in manifest else BUNDLES[bundle]
+        return [url_for('static', filename=name) for name in names]
+
+    app.jinja_env.globals['asset_urls'] = asset_urls
+    if not manifest:
+        return
+
+    max_age = app.config['ASSETS_MAX_AGE']
+    serve_source = app.view_functions['static']
+
+    @app.url_defaults
+    def fingerprint_static(endpoint, values):
+        if endpoint == 'static' and values.get('filename') in manifest:
+            values['filename'] = manifest[values['filename']]
+
+    def static(filename):
+        # Files of earlier builds are still served to pages that link them
+        if FINGERPRINTED.search(filename) and os.path.isfile(safe_join(build_dir, filename)):
+            return _send_built(build_dir, filename, max_age)
+        return serve_source(filename=filename)
+
+    app.view_functions['static'] = static
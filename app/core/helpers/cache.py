@@ -0,0 +1,84 @@
+'''
+In-process caches for rarely changing data
+'''
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+
+class TTLCache:
+    '''
+    A small thread-safe key/value cache whose entries expire after a
+    time-to-live. Values are produced by a loader on a miss and can be
+    dropped explicitly with invalidate().
+    '''
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, loader, ttl):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and entry[1] > now:
+            return entry[0]
+        value = loader()
+        with self._lock:
+            self._entries[key] = (value, now + ttl)
+        return value
+
+    def invalidate(self, *keys):
+        with self._lock:
+            if not keys:
+                self._entries.clear()
+            for key in keys:
+                self._entries.pop(key, None)
+
+
+class VersionedCache:
+    '''
+    A thread-safe LRU cache whose entries are stored with the version of
+    the data they were built from. A lookup with any other version is a
+    miss and replaces the entry, so entries never need to be invalidated.
+    '''
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version, loader, maxsize):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                return entry[1]
+        value = loader()
+        with self._lock:
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+
+def init_caches(app):
+    '''
+    Give the application caches of its own.
+    '''
+    app.extensions['caches'] = {
+        'reference_data': TTLCache(),
+        'detail_pages': VersionedCache(),
+    }
+
+
+def reference_data():
+    # Genre and State lookup lists and name->id maps
+    return current_app.extensions['caches']['reference_data']
+
+
+def detail_pages():
+    # Rendered venue and artist detail pages, keyed by entity version
+    return current_app.extensions['caches']['detail_pages']
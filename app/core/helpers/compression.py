@@ -0,0 +1,119 @@
+'''
+Negotiated response compression
+
+Rendered pages and JSON responses are compressed with brotli (when the
+Brotli package is installed) or gzip, whichever the client's
+Accept-Encoding prefers. Responses below COMPRESS_MIN_SIZE bytes are sent
+as they are, as compressing them saves less than it costs. Streamed
+responses are compressed as they are generated without being buffered.
+Files sent from disk are left alone; the static assets build has
+precompressed variants of them.
+'''
+import gzip
+import zlib
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+
+class _Gzip:
+
+    def __init__(self, level):
+        # wbits 31 writes the gzip header and trailer
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def process(self, data):
+        return self._compressor.compress(data)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class _Brotli:
+
+    def __init__(self, level):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def process(self, data):
+        return self._compressor.process(data)
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+def _encoding():
+    offered = ['br', 'gzip'] if brotli is not None else ['gzip']
+    return request.accept_encodings.best_match(offered)
+
+
+def _compress(data, encoding, config):
+    if encoding == 'br':
+        return brotli.compress(data, quality=config['COMPRESS_BROTLI_LEVEL'])
+    return gzip.compress(data, config['COMPRESS_LEVEL'])
+
+
+def _compress_stream(chunks, encoding, config):
+    compressor = (
+        _Brotli(config['COMPRESS_BROTLI_LEVEL']) if encoding == 'br'
+        else _Gzip(config['COMPRESS_LEVEL']))
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            data = compressor.process(chunk)
+            if data:
+                yield data
+        yield compressor.finish()
+    finally:
+        # Lets stream_with_context pop its request context
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+
+
+def _compressible(response, config):
+    return (
+        200 <= response.status_code < 300
+        and response.status_code != 204
+        and request.method != 'HEAD'
+        and not response.direct_passthrough
+        and 'Content-Encoding' not in response.headers
+        and response.mimetype in config['COMPRESS_MIMETYPES']
+        and 'no-transform' not in response.headers.get('Cache-Control', ''))
+
+
+def init_compression(app):
+    '''
+    Compress text responses in the encoding the client prefers.
+    '''
+    if not app.config['COMPRESS_ENABLED']:
+        return
+    config = app.config
+
+    @app.after_request
+    def compress_response(response):
+        if not _compressible(response, config):
+            return response
+        # Whether or not this one is compressed, caches must key on it
+        response.vary.add('Accept-Encoding')
+        encoding = _encoding()
+        if encoding is None:
+            return response
+        if response.is_streamed:
+            response.response = _compress_stream(response.response, encoding, config)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < config['COMPRESS_MIN_SIZE']:
+                return response
+            response.set_data(_compress(data, encoding, config))
+        response.headers['Content-Encoding'] = encoding
+        # A strong ETag identifies the exact bytes
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag('{}-{}'.format(etag, encoding))
+        return response
@@ -2,78 +2,178 @@
 Helpers for Venue database operations
 '''
 from ..helpers import *
-from datetime import datetime
-from sqlalchemy import desc
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from itertools import groupby
+from flask import current_app
+
+from .cache import reference_data
+from .pagination import paginate
+from .replicas import replica_read
+from .tasks import after_commit
+from .unit_of_work import commit_unit, release_session
 
 
 class DBApi:
 
+    @staticmethod
+    def city_query(name, state_id):
+        # Backed by the ix_city_lower_name_state_id functional index
+        return City.query.filter(
+            db.func.lower(City.name) == db.func.lower(name),
+            City.state_id == state_id)
+
+    @staticmethod
+    def address_query(house_number, street, city_id):
+        # Backed by the ix_address_lower_street_house_number_city_id
+        # functional index. A soft-deleted venue keeps its address row
+        # until purged, but no longer holds on to the address.
+        return Address.query.join(Venue, Venue.id == Address.venue_id).filter(
+            db.func.lower(Address.street) == db.func.lower(street),
+            Address.house_number == house_number,
+            Address.city_id == city_id,
+            ~Venue.deleted)
+
+    @staticmethod
+    def shows_query(cls, _id):
+        # Shows for a venue or artist, backed by the
+        # ix_show_<venue|artist>_id_start_time composite indexes
+        if cls is Venue:
+            return db.session.query(
+                show.c.artist_id.label('artist_id'),
+                Artist.name.label('artist_name'),
+                Artist.image_link.label('artist_image_link'),
+                show.c.start_time.label('start_time')).join(
+                    Artist, Artist.id == show.c.artist_id).filter(
+                        show.c.venue_id == _id, ~Artist.deleted)
+        return db.session.query(
+            show.c.venue_id.label('venue_id'),
+            Venue.name.label('venue_name'),
+            Venue.image_link.label('venue_image_link'),
+            show.c.start_time.label('start_time')).join(
+                Venue, Venue.id == show.c.venue_id).filter(
+                    show.c.artist_id == _id, ~Venue.deleted)
+
+    @staticmethod
+    def _reference_data(key, query, build):
+        # Read through the current session without closing it, so a cache
+        # miss in the middle of a create/edit leaves its transaction intact.
+        return reference_data().get(
+            key,
+            lambda: build(db.session.execute(query).fetchall()),
+            current_app.config['REFERENCE_DATA_TTL'])
+
+    @staticmethod
+    def invalidate_reference_data():
+        # Call after adding, renaming or removing genres or states
+        reference_data().invalidate()
+
     @staticmethod
     def get_genres():
-        result = []
-        try:
-            result = [(genre.name, genre.name) for genre in Genre.query.order_by('name')]
-            return result
-        except Exception as error:
-            db.session.rollback()
-            raise error
-        finally:
-            db.session.close()
+        return DBApi._reference_data(
+            'genres',
+            db.select([Genre.name]).order_by(Genre.name),
+            lambda rows: [(row.name, row.name) for row in rows])
 
     @staticmethod
     def get_states():
-        result = []
-        try:
-            result = [(state.code, state.code) for state in State.query.order_by('code')]
-            return result
-        except Exception as error:
-            db.session.rollback()
-            raise error
-        finally:
-            db.session.close()
+        return DBApi._reference_data(
+            'states',
+            db.select([State.code]).order_by(State.code),
+            lambda rows: [(row.code, row.code) for row in rows])
+
+    @staticmethod
+    def get_genre_ids():
+        return DBApi._reference_data(
+            'genre_ids', db.select([Genre.name, Genre.id]), dict)
+
+    @staticmethod
+    def get_state_ids():
+        return DBApi._reference_data(
+            'state_ids', db.select([State.code, State.id]), dict)
+
+    @staticmethod
+    def _resolve(get_ids, key, names, kind):
+        ids = get_ids()
+        if any(name not in ids for name in names):
+            # The cache may predate a newly added row; reload it once.
+            reference_data().invalidate(key)
+            ids = get_ids()
+        missing = sorted({name for name in names if name not in ids})
+        if missing:
+            raise ValueError('Invalid {} supplied: {}'.format(kind, ', '.join(missing)))
+        return [ids[name] for name in names]
+
+    @staticmethod
+    def resolve_genre_ids(names):
+        return DBApi._resolve(DBApi.get_genre_ids, 'genre_ids', names, 'genre')
+
+    @staticmethod
+    def resolve_state_ids(codes):
+        return DBApi._resolve(DBApi.get_state_ids, 'state_ids', codes, 'state')
+
+    @staticmethod
+    def resolve_state_id(code):
+        return DBApi.resolve_state_ids([code])[0]
 
     @staticmethod
-    def get_venues():
+    @replica_read
+    def get_venues(cursor=None, limit=None):
+        if limit is None:
+            limit = current_app.config['PAGE_SIZE']
         try:
-            venues = Venue.query.all()
-            # Generate a unique set of city names
-            # and group the venues by city
-            cities = set()
-            for venue in venues:
-                cities.update([venue.address.city.name])
+            # A single query returns one page of venues along with their
+            # city, state and maintained upcoming show count. Rows are paged
+            # in (city_id, venue_id) order, which keeps each city's venues
+            # together so they can be grouped in one linear pass.
+            query = db.session.query(
+                State.code.label('state'),
+                City.name.label('city'),
+                Address.city_id.label('city_id'),
+                Venue.id.label('id'),
+                Venue.name.label('name'),
+                Venue.upcoming_shows_count.label('num_upcoming_shows')
+            ).select_from(Venue).join(
+                Address, Address.venue_id == Venue.id
+            ).join(
+                City, City.id == Address.city_id
+            ).join(
+                State, State.id == City.state_id
+            ).filter(
+                ~Venue.deleted
+            )
+            venues, next_cursor = paginate(
+                query, [Address.city_id, Address.venue_id], cursor, limit,
+                row_key=lambda venue: (venue.city_id, venue.id))
             data = []
-            for city in cities:
-                tmp = {'city': city, 'venues': []}
-                for venue in venues:
-                    if venue.address.city.name == city:
-                        tmp.update({'state': venue.address.city.state.code})
-                        shows = db.session.query(
-                            show.c.artist_id.label('artist_id'),
-                            Artist.name.label('artist_name'),
-                            Artist.image_link.label('artist_image_link'),
-                            show.c.start_time.label('start_time')).join(
-                                Artist, Artist.id == show.c.artist_id).filter(
-                                    show.c.venue_id == venue.id).all()
-                        upcoming_shows = [
-                            show
-                            for show in shows if show.start_time > datetime.now()
-                        ]
-                        tmp['venues'].append({
+            for (state, city), area_venues in groupby(
+                    venues, key=lambda venue: (venue.state, venue.city)):
+                data.append({
+                    'city': city,
+                    'state': state,
+                    'venues': [
+                        {
                             'id': venue.id,
                             'name': venue.name,
-                            "num_upcoming_shows": len(upcoming_shows)})
-                data.append(tmp)
-            return data
+                            'num_upcoming_shows': venue.num_upcoming_shows
+                        }
+                        for venue in area_venues
+                    ]
+                })
+            return {'data': data, 'next_cursor': next_cursor}
         except Exception as error:
             db.session.rollback()
             raise error
         finally:
-            db.session.close()
+            release_session()
 
     @staticmethod
+    @replica_read
     def get_by_id(cls, _id):
         try:
             instance = cls.query.get(_id)
+            if instance is None or instance.deleted:
+                return None
             data = {
                 'id': instance.id,
                 'name': instance.name,
@@ -92,19 +192,13 @@ class DBApi:
                     'address': '{} {}'.format(
                         instance.address.house_number, instance.address.street)
                 })
-                shows = db.session.query(
-                    show.c.artist_id.label('artist_id'),
-                    Artist.name.label('artist_name'),
-                    Artist.image_link.label('artist_image_link'),
-                    show.c.start_time.label('start_time')).join(
-                        Artist, Artist.id == show.c.artist_id).filter(
-                            show.c.venue_id == _id).all()
+                shows = DBApi.shows_query(cls, _id).all()
                 past_shows = [
                     {
                         'artist_id': show.artist_id,
                         'artist_name': show.artist_name,
                         'artist_image_link': show.artist_image_link,
-                        'start_time': str(show.start_time)
+                        'start_time': show.start_time
                     }
                     for show in shows if show.start_time <= datetime.now()
                 ]
@@ -113,7 +207,7 @@ class DBApi:
                         'artist_id': show.artist_id,
                         'artist_name': show.artist_name,
                         'artist_image_link': show.artist_image_link,
-                        'start_time': str(show.start_time)
+                        'start_time': show.start_time
                     }
                     for show in shows if show.start_time > datetime.now()
                 ]
@@ -124,19 +218,13 @@ class DBApi:
                     'state': instance.city.state.code,
                     'seeking_venue': instance.seeking_venue
                 })
-                shows = db.session.query(
-                    show.c.venue_id.label('venue_id'),
-                    Venue.name.label('venue_name'),
-                    Venue.image_link.label('venue_image_link'),
-                    show.c.start_time.label('start_time')).join(
-                        Venue, Venue.id == show.c.venue_id).filter(
-                            show.c.artist_id == _id).all()
+                shows = DBApi.shows_query(cls, _id).all()
                 past_shows = [
                     {
                         'venue_id': show.venue_id,
                         'venue_name': show.venue_name,
                         'venue_image_link': show.venue_image_link,
-                        'start_time': str(show.start_time)
+                        'start_time': show.start_time
                     }
                     for show in shows if show.start_time <= datetime.now()
                 ]
@@ -145,7 +233,7 @@ class DBApi:
                         'venue_id': show.venue_id,
                         'venue_name': show.venue_name,
                         'venue_image_link': show.venue_image_link,
-                        'start_time': str(show.start_time)
+                        'start_time': show.start_time
                     }
                     for show in shows if show.start_time > datetime.now()
                 ]
@@ -161,22 +249,15 @@ class DBApi:
             db.session.rollback()
             raise error
         finally:
-            db.session.close()
+            release_session()
 
     @staticmethod
     def create(cls, form):
         try:
-            state = db.session.query(
-                State.id
-            ).filter(
-                State.code == form.state.data
-            ).one()
-            city = City.query.filter(
-                db.func.lower(City.name) == db.func.lower(form.city.data),
-                City.state_id == state.id
-            ).first()
+            state_id = DBApi.resolve_state_id(form.state.data)
+            city = DBApi.city_query(form.city.data, state_id).first()
             if city is None:
-                city = City(name=form.city.data, state_id=state.id)
+                city = City(name=form.city.data, state_id=state_id)
                 db.session.add(city)
                 db.session.flush()
 
@@ -193,11 +274,8 @@ class DBApi:
                 addressList = form.address.data.split(' ', 1)
                 house_number = addressList[0]
                 street = addressList[1]
-                address = Address.query.filter(
-                    Address.house_number == house_number,
-                    db.func.lower(Address.street) == db.func.lower(street),
-                    Address.city_id == city.id
-                ).first()
+                address = DBApi.address_query(
+                    house_number, street, city.id).first()
 
                 if address:
                     raise Exception('Invalid address')
@@ -209,17 +287,9 @@ class DBApi:
                 db.session.add(address)
                 db.session.flush()
 
-                for name in form.genres.data:
-                    genre = db.session.query(
-                        Genre.id
-                    ).filter(
-                        Genre.name == name
-                    ).one()
-                    add_genre_to_venue = genre_venue.insert(
-                    ).values(
-                        venue_id=instance.id,
-                        genre_id=genre.id)
-                    db.session.execute(add_genre_to_venue)
+                DBApi.set_genres(
+                    Venue, instance.id,
+                    DBApi.resolve_genre_ids(form.genres.data), current=())
             if cls is Artist:
                 instance = Artist(
                     name=form.name.data,
@@ -231,41 +301,29 @@ class DBApi:
                 db.session.add(instance)
                 db.session.flush()
 
-                for name in form.genres.data:
-                    genre = db.session.query(
-                        Genre.id
-                    ).filter(
-                        Genre.name == name
-                    ).one()
-                    add_genre_to_artist = genre_artist.insert(
-                    ).values(
-                        artist_id=instance.id,
-                        genre_id=genre.id)
-                    db.session.execute(add_genre_to_artist)
-            db.session.commit()
+                DBApi.set_genres(
+                    Artist, instance.id,
+                    DBApi.resolve_genre_ids(form.genres.data), current=())
+            commit_unit()
             return True
         except Exception as error:
             db.session.rollback()
             raise error
         finally:
-            db.session.close()
+            release_session()
 
     @staticmethod
     def edit(cls, form, _id):
         try:
-            state = db.session.query(
-                State.id
-            ).filter(
-                State.code == form.state.data
-            ).one()
-            city = City.query.filter(
-                db.func.lower(City.name) == db.func.lower(form.city.data),
-                City.state_id == state.id
-            ).first()
+            instance = cls.query.filter(cls.id == _id, ~cls.deleted).first()
+            if instance is None:
+                raise ValueError('Invalid {} ID supplied'.format(cls.__name__))
+            state_id = DBApi.resolve_state_id(form.state.data)
+            city = DBApi.city_query(form.city.data, state_id).first()
             if city is None:
                 city = City(
                     name=form.city.data,
-                    state_id=state.id)
+                    state_id=state_id)
                 db.session.add(city)
                 db.session.flush()
             if cls is Venue:
@@ -273,11 +331,8 @@ class DBApi:
                 house_number = addressList[0]
                 street = addressList[1]
                 # check if the input address exists
-                address = Address.query.filter(
-                    Address.house_number == house_number,
-                    db.func.lower(Address.street) == db.func.lower(street),
-                    Address.city_id == city.id
-                ).first()
+                address = DBApi.address_query(
+                    house_number, street, city.id).first()
 
                 if not address:
                     # delete the venue's old address
@@ -295,14 +350,10 @@ class DBApi:
                 if address.venue_id != _id:
                     raise Exception('Invalid address')
 
-            instance = cls.query.get(_id)
             instance.name = form.name.data
             instance.phone = form.phone.data
-            genres = [
-                Genre.query.filter(Genre.name == genre).one()
-                for genre in form.genres.data
-            ]
-            instance.genres = genres
+            DBApi.set_genres(
+                cls, _id, DBApi.resolve_genre_ids(form.genres.data))
             instance.image_link = form.image_link.data
             instance.facebook_link = form.facebook_link.data
             if cls is Venue:
@@ -312,130 +363,479 @@ class DBApi:
                 instance.seeking_venue = form.seeking_venue.data
             instance.seeking_description = form.seeking_description.data
             instance.website = form.website.data
+            # Genre and address changes alone don't trigger the onupdate
+            instance.updated_at = datetime.now()
             db.session.add(instance)
-            db.session.commit()
+            after_commit(DBApi.touch_show_partners, cls, _id)
+            commit_unit()
+        except Exception as error:
+            db.session.rollback()
+            raise error
+        finally:
+            release_session()
+
+    @staticmethod
+    def set_genres(cls, _id, genre_ids, current=None):
+        # Writes only the difference between the current and the wanted
+        # genres, with one multi-row DELETE and one multi-row INSERT at
+        # most. `current` can be passed when known (e.g. empty for a new
+        # row). Runs inside the caller's transaction.
+        association = genre_venue if cls is Venue else genre_artist
+        owner = association.c.venue_id if cls is Venue else association.c.artist_id
+        if current is None:
+            current = {
+                row.genre_id for row in db.session.execute(
+                    db.select([association.c.genre_id]).where(owner == _id))}
+        wanted = set(genre_ids)
+        removed = set(current) - wanted
+        added = wanted - set(current)
+        if removed:
+            db.session.execute(association.delete().where(db.and_(
+                owner == _id, association.c.genre_id.in_(removed))))
+        if added:
+            db.session.execute(association.insert().values([
+                {owner.name: _id, 'genre_id': genre_id}
+                for genre_id in sorted(added)]))
+        instance = db.session.identity_map.get(db.session.identity_key(cls, _id))
+        if instance is not None:
+            db.session.expire(instance, ['genres'])
+
+    @staticmethod
+    def touch_show_partners(cls, _id):
+        # Detail pages list the name and image of the other side of each
+        # show, so bump the venues/artists sharing a show with this one.
+        # Runs inside the caller's transaction, or as a background task.
+        other = Artist if cls is Venue else Venue
+        own_fk, other_fk = (
+            (show.c.venue_id, show.c.artist_id) if cls is Venue
+            else (show.c.artist_id, show.c.venue_id))
+        db.session.execute(
+            other.__table__.update().where(
+                other.id.in_(db.select([other_fk]).where(own_fk == _id))
+            ).values(updated_at=datetime.now()))
+
+    @staticmethod
+    @replica_read
+    def get_version(cls, _id):
+        # The columns a venue or artist detail page changes with:
+        # (updated_at, next_show_time, upcoming_shows_count,
+        # past_shows_count), None if missing
+        try:
+            return db.session.query(
+                cls.updated_at,
+                cls.next_show_time,
+                cls.upcoming_shows_count,
+                cls.past_shows_count
+            ).filter(cls.id == _id, ~cls.deleted).first()
+        except Exception as error:
+            db.session.rollback()
+            raise error
+        finally:
+            release_session()
+
+    @staticmethod
+    def delete(cls, _id):
+        # Deletes a venue or artist with set-based statements, without
+        # loading it or its shows, genres and address. With SOFT_DELETE the
+        # row is only flagged, which hides it and its shows from all reads.
+        # The show counts of the other side of its shows are refreshed in
+        # the background once the delete has committed.
+        try:
+            other = Artist if cls is Venue else Venue
+            own_fk, other_fk = (
+                (show.c.venue_id, show.c.artist_id) if cls is Venue
+                else (show.c.artist_id, show.c.venue_id))
+            partner_ids = [
+                row[0] for row in db.session.execute(
+                    db.select([other_fk]).where(own_fk == _id).distinct())]
+            if current_app.config['SOFT_DELETE']:
+                deleted = db.session.execute(
+                    cls.__table__.update().where(db.and_(
+                        cls.id == _id, ~cls.deleted
+                    )).values(deleted=True, updated_at=datetime.now())).rowcount
+            else:
+                # The foreign keys cascade as well; the explicit deletes
+                # cover SQLite, which leaves foreign keys unenforced by
+                # default.
+                association = genre_venue if cls is Venue else genre_artist
+                db.session.execute(show.delete().where(own_fk == _id))
+                db.session.execute(association.delete().where(
+                    association.c[own_fk.name] == _id))
+                if cls is Venue:
+                    db.session.execute(
+                        Address.__table__.delete().where(Address.venue_id == _id))
+                deleted = db.session.execute(
+                    cls.__table__.delete().where(cls.id == _id)).rowcount
+            if not deleted:
+                raise ValueError('Invalid {} ID supplied'.format(cls.__name__))
+            if partner_ids:
+                after_commit(DBApi.refresh_show_counts, other, partner_ids)
+            instance = db.session.identity_map.get(db.session.identity_key(cls, _id))
+            if instance is not None:
+                db.session.expunge(instance)
+            commit_unit()
+            return True
         except Exception as error:
             db.session.rollback()
             raise error
         finally:
-            db.session.close()
+            release_session()
 
     @staticmethod
     def delete_venue(venue_id):
+        return DBApi.delete(Venue, venue_id)
+
+    @staticmethod
+    def delete_artist(artist_id):
+        return DBApi.delete(Artist, artist_id)
+
+    @staticmethod
+    def purge_deleted():
+        # Removes the soft-deleted venues and artists for good, found
+        # through the indexed deleted flag. Their shows have already
+        # been left out of every count.
         try:
-            venue = Venue.query.get(venue_id)
-            db.session.delete(venue)
-            db.session.commit()
+            purged = 0
+            for cls in (Venue, Artist):
+                own_fk = show.c.venue_id if cls is Venue else show.c.artist_id
+                association = genre_venue if cls is Venue else genre_artist
+                flagged = db.select([cls.id]).where(cls.deleted)
+                db.session.execute(show.delete().where(own_fk.in_(flagged)))
+                db.session.execute(association.delete().where(
+                    association.c[own_fk.name].in_(flagged)))
+                if cls is Venue:
+                    db.session.execute(Address.__table__.delete().where(
+                        Address.venue_id.in_(flagged)))
+                purged += db.session.execute(
+                    cls.__table__.delete().where(cls.deleted)).rowcount
+            commit_unit()
+            return purged
         except Exception as error:
             db.session.rollback()
             raise error
         finally:
-            db.session.close()
+            release_session()
 
     @staticmethod
-    def get_artists():
+    @replica_read
+    def get_artists(cursor=None, limit=None):
+        if limit is None:
+            limit = current_app.config['PAGE_SIZE']
         try:
-            data = []
-            artists = db.session.query(
-                Artist.id,
-                Artist.name).order_by(
-                    desc('updated_at')).all()
-            for artist in artists:
-                data.append({
+            # Newest first, by id: unlike updated_at it never changes, so
+            # rows can't move across pages while a client pages through
+            artists, next_cursor = paginate(
+                db.session.query(
+                    Artist.id,
+                    Artist.name
+                ).filter(~Artist.deleted),
+                [Artist.id], cursor, limit,
+                row_key=lambda artist: (artist.id,),
+                descending=True)
+            data = [
+                {
                     'id': artist.id,
                     'name': artist.name
-                })
-            return data
+                }
+                for artist in artists
+            ]
+            return {'data': data, 'next_cursor': next_cursor}
         except Exception as error:
             db.session.rollback()
             raise error
         finally:
-            db.session.close()
+            release_session()
 
     @staticmethod
-    def search_venues_or_artists(cls, search_term):
+    @replica_read
+    def search_venues_or_artists(cls, search_term, cursor=None, limit=None):
         search_format = '%{}%'.format(search_term)
+        if limit is None:
+            limit = current_app.config['SEARCH_PAGE_SIZE']
         try:
-            instances = cls.query.filter(
-                db.func.lower(cls.name).like(search_format.lower())
-            ).all()
+            # Matches and their maintained upcoming show counts come from
+            # one query, paged by id so each page costs the same to fetch.
+            query = db.session.query(
+                cls.id.label('id'),
+                cls.name.label('name'),
+                cls.upcoming_shows_count.label('upcoming_shows')
+            ).filter(
+                db.func.lower(cls.name).like(search_format.lower()),
+                ~cls.deleted
+            )
+            instances, next_cursor = paginate(
+                query, [cls.id], cursor, limit,
+                row_key=lambda instance: (instance.id,))
+            # page_count is the number of matches on this page: counting
+            # them all would take a scan of every name
             data = {
-                'count': len(instances),
-                'data': []
-            }
-            for instance in instances:
-                if cls is Venue:
-                    upcoming_shows = db.session.query(
-                        db.func.count().label('count')
-                    ).filter(
-                        show.c.start_time > datetime.now(),
-                        show.c.venue_id == instance.id
-                    ).all()
-                    data['data'].append({
-                        'id': instance.id,
-                        'name': instance.name,
-                        'upcoming_shows': upcoming_shows[0].count
-                    })
-                if cls is Artist:
-                    upcoming_shows = db.session.query(
-                        db.func.count().label('count')
-                    ).filter(
-                        show.c.start_time > datetime.now(),
-                        show.c.artist_id == instance.id
-                    ).all()
-                    data['data'].append({
+                'page_count': len(instances),
+                'data': [
+                    {
                         'id': instance.id,
                         'name': instance.name,
-                        'upcoming_shows': upcoming_shows[0].count
-                    })
+                        'upcoming_shows': instance.upcoming_shows
+                    }
+                    for instance in instances
+                ],
+                'next_cursor': next_cursor
+            }
             return data
         except Exception as error:
             db.session.rollback()
             raise error
         finally:
-            db.session.close()
+            release_session()
+
+    @staticmethod
+    def available_venues_query(city_id, day, genre_id=None):
+        # Venues of a city (optionally with a genre) without a show that
+        # runs into the given day. The city is a range of the
+        # (city_id, venue_id) address index, and each venue costs a probe
+        # of the GenreVenue primary key and of the (venue_id, start_time)
+        # show index; no venue's shows are scanned. Shows of soft-deleted
+        # artists don't take the venue.
+        day_start = datetime.combine(day, datetime.min.time())
+        duration = timedelta(minutes=current_app.config['SHOW_DURATION_MINUTES'])
+        query = db.session.query(
+            Venue.id,
+            Venue.name,
+            Venue.upcoming_shows_count,
+            Address.house_number,
+            Address.street
+        ).join(
+            Address, Address.venue_id == Venue.id
+        ).filter(
+            Address.city_id == city_id,
+            ~Venue.deleted,
+            ~db.exists().where(db.and_(
+                show.c.venue_id == Address.venue_id,
+                show.c.start_time > day_start - duration,
+                show.c.start_time < day_start + timedelta(days=1),
+                Artist.id == show.c.artist_id,
+                ~Artist.deleted))
+        )
+        if genre_id is not None:
+            query = query.filter(db.exists().where(db.and_(
+                genre_venue.c.venue_id == Address.venue_id,
+                genre_venue.c.genre_id == genre_id)))
+        return query
+
+    @staticmethod
+    @replica_read
+    def find_available_venues(city, state, day, genre=None, cursor=None, limit=None):
+        if limit is None:
+            limit = current_app.config['SEARCH_PAGE_SIZE']
+        try:
+            state_id = DBApi.resolve_state_id(state)
+            genre_id = DBApi.resolve_genre_ids([genre])[0] if genre else None
+            city_row = DBApi.city_query(city, state_id).first()
+            if city_row is None:
+                return {'page_count': 0, 'data': [], 'next_cursor': None}
+            venues, next_cursor = paginate(
+                DBApi.available_venues_query(city_row.id, day, genre_id),
+                [Address.venue_id], cursor, limit,
+                row_key=lambda venue: (venue.id,))
+            return {
+                'page_count': len(venues),
+                'data': [
+                    {
+                        'id': venue.id,
+                        'name': venue.name,
+                        'address': '{} {}'.format(venue.house_number, venue.street),
+                        'upcoming_shows': venue.upcoming_shows_count
+                    }
+                    for venue in venues
+                ],
+                'next_cursor': next_cursor
+            }
+        except Exception as error:
+            db.session.rollback()
+            raise error
+        finally:
+            release_session()
 
     @staticmethod
     def create_show(form):
+        # Books the show, or every show of a recurring booking, in one
+        # transaction; returns the number of shows booked
         try:
-            artist = db.session.query(Artist.id).filter(
-                Artist.id == form.artist_id.data).first()
-            venue = db.session.query(Venue.id).filter(
-                Venue.id == form.venue_id.data).first()
-            if venue and artist:
-                new_show = show.insert().values(
-                    venue_id=venue.id,
-                    artist_id=artist.id,
-                    start_time=form.start_time.data)
-                db.session.execute(new_show)
-                db.session.commit()
-                return True
-            raise ValueError('Invalid Artist ID or Venue ID supplied')
+            start_times = form.start_times(current_app.config['MAX_RECURRING_SHOWS'])
+            DBApi.book_shows(form.venue_id.data, form.artist_id.data, start_times)
+            commit_unit()
+            return len(start_times)
         except Exception as error:
             db.session.rollback()
             raise error
         finally:
-            db.session.close()
+            release_session()
+
+    @staticmethod
+    def book_shows(venue_id, artist_id, start_times):
+        # Runs inside the caller's transaction
+        venue_exists, artist_exists = db.session.query(
+            db.exists().where(db.and_(Venue.id == venue_id, ~Venue.deleted)),
+            db.exists().where(db.and_(Artist.id == artist_id, ~Artist.deleted))
+        ).one()
+        if not (venue_exists and artist_exists):
+            raise ValueError('Invalid Artist ID or Venue ID supplied')
+        conflicts = DBApi.find_show_conflicts(venue_id, artist_id, start_times)
+        if conflicts:
+            raise ValueError(
+                'The venue or the artist is already booked around {}'.format(
+                    ', '.join(str(start_time) for start_time in conflicts[:5])))
+        db.session.execute(show.insert().values([
+            {'venue_id': venue_id, 'artist_id': artist_id, 'start_time': start_time}
+            for start_time in start_times
+        ]))
+        DBApi.refresh_show_counts(Venue, [venue_id])
+        DBApi.refresh_show_counts(Artist, [artist_id])
+
+    @staticmethod
+    def show_conflicts_query(venue_id, artist_id, start, end):
+        # Shows of the venue or the artist starting within (start, end);
+        # a range scan on each of the (venue_id|artist_id, start_time)
+        # indexes. Shows with a soft-deleted venue or artist don't count.
+        return db.session.query(show.c.start_time).join(
+            Venue, Venue.id == show.c.venue_id
+        ).join(
+            Artist, Artist.id == show.c.artist_id
+        ).filter(
+            db.or_(show.c.venue_id == venue_id, show.c.artist_id == artist_id),
+            show.c.start_time > start,
+            show.c.start_time < end,
+            ~Venue.deleted,
+            ~Artist.deleted
+        ).order_by(show.c.start_time)
 
     @staticmethod
-    def get_shows():
+    def find_show_conflicts(venue_id, artist_id, start_times):
+        # Start times that are less than a show's duration away from
+        # another show of the venue or the artist, or from each other.
+        # One query covers the whole range of the booking.
+        duration = timedelta(minutes=current_app.config['SHOW_DURATION_MINUTES'])
+        start_times = sorted(start_times)
+        conflicts = {
+            later for earlier, later in zip(start_times, start_times[1:])
+            if later - earlier < duration
+        }
+        booked = [
+            row.start_time for row in DBApi.show_conflicts_query(
+                venue_id, artist_id,
+                start_times[0] - duration, start_times[-1] + duration)
+        ]
+        for start_time in start_times:
+            position = bisect_right(booked, start_time - duration)
+            if position < len(booked) and booked[position] < start_time + duration:
+                conflicts.add(start_time)
+        return sorted(conflicts)
+
+    @staticmethod
+    def delete_show(show_id):
         try:
-            shows = db.session.query(
-                Venue.name.label('venue'),
-                Artist.name.label('artist'),
-                Artist.image_link,
+            booking = db.session.query(
                 show.c.venue_id,
-                show.c.artist_id,
-                show.c.start_time
-            ).join(
-                Venue,
-                show.c.venue_id == Venue.id
-            ).join(
-                Artist,
-                show.c.artist_id == Artist.id
-            ).order_by(
-                desc(show.c.start_time)
-            ).all()
+                show.c.artist_id
+            ).filter(
+                show.c.id == show_id
+            ).first()
+            if booking is None:
+                raise ValueError('Invalid Show ID supplied')
+            db.session.execute(show.delete().where(show.c.id == show_id))
+            DBApi.refresh_show_counts(Venue, [booking.venue_id])
+            DBApi.refresh_show_counts(Artist, [booking.artist_id])
+            commit_unit()
+            return True
+        except Exception as error:
+            db.session.rollback()
+            raise error
+        finally:
+            release_session()
+
+    @staticmethod
+    def _show_counts_update(cls, now):
+        # Recomputes the show summary columns of cls from the Show table with
+        # correlated subqueries, each an index range scan on
+        # (venue_id|artist_id, start_time). updated_at is kept: the summary
+        # columns are part of the detail page version themselves.
+        # Shows with a soft-deleted venue/artist on the other side don't
+        # count.
+        other = Artist if cls is Venue else Venue
+        show_fk, other_fk = (
+            (show.c.venue_id, show.c.artist_id) if cls is Venue
+            else (show.c.artist_id, show.c.venue_id))
+        listed = ~db.exists().where(db.and_(other.id == other_fk, other.deleted))
+
+        def shows_where(column, condition):
+            return db.select([column]).where(
+                db.and_(show_fk == cls.id, listed, condition)).as_scalar()
+
+        return cls.__table__.update().values(
+            upcoming_shows_count=shows_where(
+                db.func.count(show.c.id), show.c.start_time > now),
+            past_shows_count=shows_where(
+                db.func.count(show.c.id), show.c.start_time <= now),
+            next_show_time=shows_where(
+                db.func.min(show.c.start_time), show.c.start_time > now),
+            # Keeps the column's onupdate from firing
+            updated_at=cls.updated_at)
+
+    @staticmethod
+    def refresh_show_counts(cls, ids):
+        # Runs inside the caller's transaction, or as a background task
+        db.session.execute(
+            DBApi._show_counts_update(cls, datetime.now()).where(
+                cls.id.in_(ids)))
+
+    @staticmethod
+    def roll_show_counts(rebuild=False):
+        # Moves shows that have started from the upcoming to the past
+        # counts. Only venues and artists whose next show has started are
+        # touched, unless rebuild is set. Meant to be run on a schedule.
+        try:
+            now = datetime.now()
+            updated = 0
+            for cls in (Venue, Artist):
+                statement = DBApi._show_counts_update(cls, now)
+                if not rebuild:
+                    statement = statement.where(cls.next_show_time <= now)
+                updated += db.session.execute(statement).rowcount
+            commit_unit()
+            return updated
+        except Exception as error:
+            db.session.rollback()
+            raise error
+        finally:
+            release_session()
+
+    @staticmethod
+    @replica_read
+    def get_shows(cursor=None, limit=None):
+        if limit is None:
+            limit = current_app.config['PAGE_SIZE']
+        try:
+            shows, next_cursor = paginate(
+                db.session.query(
+                    Venue.name.label('venue'),
+                    Artist.name.label('artist'),
+                    Artist.image_link,
+                    show.c.id,
+                    show.c.venue_id,
+                    show.c.artist_id,
+                    show.c.start_time
+                ).join(
+                    Venue,
+                    show.c.venue_id == Venue.id
+                ).join(
+                    Artist,
+                    show.c.artist_id == Artist.id
+                ).filter(
+                    ~Venue.deleted,
+                    ~Artist.deleted
+                ),
+                [show.c.start_time, show.c.id], cursor, limit,
+                row_key=lambda booking: (booking.start_time, booking.id),
+                descending=True)
             data = []
             for booking in shows:
                 data.append({
@@ -444,11 +844,11 @@ class DBApi:
                     'artist_id': booking.artist_id,
                     'artist_name': booking.artist,
                     'artist_image_link': booking.image_link,
-                    'start_time': str(booking.start_time)
+                    'start_time': booking.start_time
                 })
-            return data
+            return {'data': data, 'next_cursor': next_cursor}
         except Exception as error:
             db.session.rollback()
             raise error
         finally:
-            db.session.close()
+            release_session()
@@ -0,0 +1,30 @@
+'''
+Helpers for inspecting the query plans of DBApi queries
+'''
+from app import db
+
+
+def explain(query):
+    '''
+    Return the query plan of a Query (or select) as a list of lines.
+
+    On PostgreSQL sequential scans are disabled for the duration of the
+    transaction so that the plan reflects whether a usable index exists,
+    rather than the planner's preference for tiny development tables.
+    '''
+    statement = getattr(query, 'statement', query)
+    connection = db.session.connection()
+    dialect = connection.dialect
+    sql = str(statement.compile(
+        dialect=dialect, compile_kwargs={'literal_binds': True}))
+    try:
+        if dialect.name == 'sqlite':
+            rows = connection.execute('EXPLAIN QUERY PLAN ' + sql).fetchall()
+        else:
+            if dialect.name == 'postgresql':
+                connection.execute('SET LOCAL enable_seqscan = off')
+            rows = connection.execute('EXPLAIN ' + sql).fetchall()
+        # SQLite returns (id, parent, notused, detail), others a single column
+        return [row[-1] for row in rows]
+    finally:
+        db.session.rollback()
@@ -0,0 +1,321 @@
+'''
+Helpers for bulk importing venues, artists and shows from CSV/NDJSON files
+'''
+import csv
+import json
+import os
+import re
+import time
+from datetime import datetime
+from itertools import islice
+
+from ..helpers import *
+from .database import DBApi
+
+
+# Stay below SQLite's default bound parameter limit; other databases allow
+# far larger statements.
+SQLITE_MAX_PARAMETERS = 999
+MAX_PARAMETERS = 30000
+
+
+class BulkImportError(Exception):
+    pass
+
+
+def read_records(path):
+    '''Yield dict records from a .csv file or a newline-delimited JSON file.'''
+    with open(path, newline='', encoding='utf-8') as source:
+        if path.lower().endswith('.csv'):
+            for record in csv.DictReader(source):
+                yield record
+        else:
+            for line in source:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def _text(record, key):
+    value = record.get(key)
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _flag(record, key):
+    value = record.get(key)
+    if isinstance(value, bool):
+        return value
+    return str(value or '').strip().lower() in ('1', 'true', 'yes', 'y')
+
+
+def _list(record, key):
+    value = record.get(key) or []
+    if isinstance(value, str):
+        value = re.split(r'[;,]', value)
+    return [item.strip() for item in value if item.strip()]
+
+
+class BulkImporter:
+    '''
+    Imports records in batches. Each batch resolves its states, cities and
+    genres with a handful of set-based queries (backed by caches that live
+    for the whole import), writes every table with multi-row INSERTs and is
+    committed on its own together with the import's progress, so an import
+    can be resumed after a failure from the last committed batch.
+    '''
+
+    def __init__(self, kind, batch_size=500, report=print):
+        if kind not in ('venues', 'artists', 'shows'):
+            raise ValueError('Unknown import kind: {}'.format(kind))
+        self.kind = kind
+        self.batch_size = batch_size
+        self.report = report
+        self.cities = {}
+
+    # Progress ----------------------------------------------------------
+
+    def _progress(self, source):
+        return ImportProgress.query.get((source, self.kind))
+
+    def _load_progress(self, source):
+        try:
+            progress = self._progress(source)
+            return progress.records if progress is not None else 0
+        finally:
+            db.session.close()
+
+    def _save_progress(self, source, records):
+        # Runs in the batch's transaction, so the two commit together
+        progress = self._progress(source)
+        if progress is None:
+            db.session.add(ImportProgress(source=source, kind=self.kind, records=records))
+        else:
+            progress.records = records
+
+    def _clear_progress(self, source):
+        try:
+            ImportProgress.query.filter_by(source=source, kind=self.kind).delete()
+            db.session.commit()
+        finally:
+            db.session.close()
+
+    # Driver ------------------------------------------------------------
+
+    def run(self, path, restart=False):
+        source = os.path.abspath(path)
+        done = 0 if restart else self._load_progress(source)
+        if done:
+            self.report('Resuming after {} already imported records'.format(done))
+        records = islice(read_records(path), done, None)
+        started = time.monotonic()
+        imported = 0
+        batch_number = 0
+        while True:
+            batch = list(islice(records, self.batch_size))
+            if not batch:
+                break
+            batch_number += 1
+            batch_started = time.monotonic()
+            try:
+                getattr(self, '_import_' + self.kind)(batch, done)
+                self._save_progress(source, done + len(batch))
+                db.session.commit()
+            except Exception as error:
+                db.session.rollback()
+                # Cities inserted by the failed batch were rolled back too
+                self.cities.clear()
+                raise BulkImportError(
+                    'Batch {} (records {}-{}) failed: {}'.format(
+                        batch_number, done + 1, done + len(batch), error))
+            finally:
+                db.session.close()
+            done += len(batch)
+            imported += len(batch)
+            elapsed = time.monotonic() - batch_started
+            self.report('Batch {}: {} records in {:.2f}s ({:.0f} records/s)'.format(
+                batch_number, len(batch), elapsed, len(batch) / max(elapsed, 1e-9)))
+        self._clear_progress(source)
+        elapsed = time.monotonic() - started
+        self.report('Imported {} {} in {:.2f}s ({:.0f} records/s)'.format(
+            imported, self.kind, elapsed, imported / max(elapsed, 1e-9)))
+        return imported
+
+    # Set-based helpers -------------------------------------------------
+
+    @staticmethod
+    def _insert_many(table, rows):
+        # Multi-row INSERT statements, split to respect the bound
+        # parameter limit of the database.
+        if not rows:
+            return
+        limit = MAX_PARAMETERS
+        if db.session.bind.dialect.name == 'sqlite':
+            limit = SQLITE_MAX_PARAMETERS
+        per_statement = max(1, limit // len(rows[0]))
+        for start in range(0, len(rows), per_statement):
+            db.session.execute(
+                table.insert().values(rows[start:start + per_statement]))
+
+    @staticmethod
+    def _allocate_ids(table, count):
+        # Reserve primary keys up front so that dependent rows can be
+        # written with multi-row INSERTs as well.
+        if db.session.bind.dialect.name == 'postgresql':
+            rows = db.session.execute(
+                "SELECT nextval(pg_get_serial_sequence(:table, 'id')) "
+                "FROM generate_series(1, :count)",
+                {'table': '"{}"'.format(table.name), 'count': count})
+            return [row[0] for row in rows]
+        # Elsewhere ids follow the current maximum, which assumes the
+        # import is the only writer while it runs.
+        start = db.session.query(
+            db.func.coalesce(db.func.max(table.c.id), 0)).scalar()
+        return list(range(start + 1, start + count + 1))
+
+    def _resolve_states(self, batch, offset):
+        try:
+            return DBApi.resolve_state_ids(
+                [_text(record, 'state') or '' for record in batch])
+        except ValueError as error:
+            raise ValueError('{} in records from {}'.format(
+                error.args[0], offset + 1))
+
+    def _resolve_cities(self, batch, state_ids):
+        keys = [
+            ((_text(record, 'city') or '').lower(), state_id)
+            for record, state_id in zip(batch, state_ids)
+        ]
+        names = {}
+        for record, key in zip(batch, keys):
+            names.setdefault(key, _text(record, 'city'))
+        missing = [key for key in names if key not in self.cities]
+        if missing:
+            self._load_cities(missing)
+            new = [key for key in missing if key not in self.cities]
+            if new:
+                self._insert_many(City.__table__, [
+                    {'name': names[key], 'state_id': key[1]} for key in new])
+                self._load_cities(new)
+        return [self.cities[key] for key in keys]
+
+    def _load_cities(self, keys):
+        # Uses the ix_city_lower_name_state_id functional index
+        rows = db.session.query(
+            City.id, db.func.lower(City.name).label('name'), City.state_id
+        ).filter(
+            db.tuple_(db.func.lower(City.name), City.state_id).in_(keys)
+        ).all()
+        for row in rows:
+            self.cities.setdefault((row.name, row.state_id), row.id)
+
+    def _genre_rows(self, batch, ids, owner_column, offset):
+        rows = []
+        for position, (record, _id) in enumerate(zip(batch, ids)):
+            names = _list(record, 'genres')
+            try:
+                genre_ids = DBApi.resolve_genre_ids(names)
+            except ValueError as error:
+                raise ValueError('{} in record {}'.format(
+                    error.args[0], offset + position + 1))
+            rows.extend(
+                {owner_column: _id, 'genre_id': genre_id}
+                for genre_id in set(genre_ids))
+        return rows
+
+    @staticmethod
+    def _profile(record):
+        return {
+            'name': _text(record, 'name'),
+            'phone': _text(record, 'phone'),
+            'image_link': _text(record, 'image_link'),
+            'website': _text(record, 'website'),
+            'facebook_link': _text(record, 'facebook_link'),
+            'seeking_description': _text(record, 'seeking_description'),
+        }
+
+    # Importers ---------------------------------------------------------
+
+    def _import_venues(self, batch, offset):
+        addresses = []
+        for position, record in enumerate(batch):
+            parts = (_text(record, 'address') or '').split(' ', 1)
+            try:
+                addresses.append((int(parts[0]), parts[1]))
+            except (ValueError, IndexError):
+                raise ValueError(
+                    'Invalid address in record {}. Expected format - '
+                    'House-number Street'.format(offset + position + 1))
+        city_ids = self._resolve_cities(batch, self._resolve_states(batch, offset))
+        keys = [
+            (street.lower(), house_number, city_id)
+            for (house_number, street), city_id in zip(addresses, city_ids)
+        ]
+        taken = db.session.query(Address.id).filter(
+            db.tuple_(
+                db.func.lower(Address.street),
+                Address.house_number,
+                Address.city_id
+            ).in_(keys)
+        ).first()
+        if taken is not None or len(set(keys)) != len(keys):
+            raise ValueError('Duplicate venue address in batch')
+
+        ids = self._allocate_ids(Venue.__table__, len(batch))
+        self._insert_many(Venue.__table__, [
+            dict(self._profile(record), id=_id,
+                 seeking_talent=_flag(record, 'seeking_talent'))
+            for record, _id in zip(batch, ids)
+        ])
+        self._insert_many(Address.__table__, [
+            {
+                'house_number': house_number,
+                'street': street,
+                'city_id': city_id,
+                'venue_id': _id
+            }
+            for (house_number, street), city_id, _id in zip(addresses, city_ids, ids)
+        ])
+        self._insert_many(
+            genre_venue, self._genre_rows(batch, ids, 'venue_id', offset))
+
+    def _import_artists(self, batch, offset):
+        city_ids = self._resolve_cities(batch, self._resolve_states(batch, offset))
+        ids = self._allocate_ids(Artist.__table__, len(batch))
+        self._insert_many(Artist.__table__, [
+            dict(self._profile(record), id=_id, city_id=city_id,
+                 seeking_venue=_flag(record, 'seeking_venue'))
+            for record, _id, city_id in zip(batch, ids, city_ids)
+        ])
+        self._insert_many(
+            genre_artist, self._genre_rows(batch, ids, 'artist_id', offset))
+
+    def _import_shows(self, batch, offset):
+        rows = []
+        for position, record in enumerate(batch):
+            try:
+                rows.append({
+                    'venue_id': int(record['venue_id']),
+                    'artist_id': int(record['artist_id']),
+                    'start_time': datetime.fromisoformat(
+                        str(record['start_time']).strip())
+                })
+            except (KeyError, TypeError, ValueError):
+                raise ValueError('Invalid show in record {}'.format(
+                    offset + position + 1))
+        venue_ids = {row['venue_id'] for row in rows}
+        artist_ids = {row['artist_id'] for row in rows}
+        found_venues = {
+            row.id for row in
+            db.session.query(Venue.id).filter(
+                Venue.id.in_(venue_ids), ~Venue.deleted)}
+        found_artists = {
+            row.id for row in
+            db.session.query(Artist.id).filter(
+                Artist.id.in_(artist_ids), ~Artist.deleted)}
+        if found_venues != venue_ids or found_artists != artist_ids:
+            raise ValueError('Invalid Artist ID or Venue ID supplied')
+        self._insert_many(show, rows)
+        DBApi.refresh_show_counts(Venue, list(venue_ids))
+        DBApi.refresh_show_counts(Artist, list(artist_ids))
@@ -0,0 +1,131 @@
+'''
+Per-request SQL instrumentation and query budgets
+'''
+import time
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class RequestStats:
+    '''SQL statistics collected while handling one request.'''
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.checkouts = 0
+        self.db_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_statement = None
+
+    def record(self, statement, duration):
+        self.queries += 1
+        self.db_time += duration
+        if duration > self.slowest_time:
+            self.slowest_time = duration
+            self.slowest_statement = statement
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+def current_stats():
+    if has_request_context():
+        return g.get('request_stats')
+    return None
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info['query_started'].pop()
+    stats = current_stats()
+    if stats is not None:
+        stats.record(statement, duration)
+
+
+@event.listens_for(Pool, 'checkout')
+def _checkout(dbapi_connection, connection_record, connection_proxy):
+    stats = current_stats()
+    if stats is not None:
+        stats.checkouts += 1
+
+
+@event.listens_for(Engine, 'handle_error')
+def _handle_error(exception_context):
+    # Failed statements never reach after_cursor_execute
+    started = exception_context.connection.info.get('query_started') \
+        if exception_context.connection is not None else None
+    if started:
+        started.pop()
+
+
+def _server_timing(stats):
+    return 'db;dur={:.2f};desc="{} queries, {} checkouts", app;dur={:.2f}'.format(
+        stats.db_time * 1000, stats.queries, stats.checkouts, stats.elapsed * 1000)
+
+
+def _summary(stats, response):
+    summary = '{} {} {} queries={} checkouts={} db={:.1f}ms total={:.1f}ms'.format(
+        request.method, request.path, response.status_code, stats.queries,
+        stats.checkouts, stats.db_time * 1000, stats.elapsed * 1000)
+    if stats.slowest_statement:
+        summary += ' slowest={:.1f}ms {}'.format(
+            stats.slowest_time * 1000,
+            ' '.join(stats.slowest_statement.split())[:200])
+    return summary
+
+
+def init_instrumentation(app):
+    '''
+    Record SQL statistics for every request, send them in a Server-Timing
+    header and log them.
+    '''
+
+    @app.before_request
+    def start_request_stats():
+        g.request_stats = RequestStats()
+
+    @app.after_request
+    def report_request_stats(response):
+        stats = current_stats()
+        if stats is None:
+            return response
+        response.headers.add('Server-Timing', _server_timing(stats))
+        if app.config['SQL_INSTRUMENTATION_LOG']:
+            app.logger.info(_summary(stats, response))
+        return response
+
+
+def init_query_budgets(app):
+    '''
+    Check the SQL statement count of every request against QUERY_BUDGETS.
+    Registered after the unit of work, so that it runs before the request's
+    commit and a QueryBudgetExceeded rolls the request back.
+    '''
+
+    @app.after_request
+    def check_query_budget(response):
+        stats = current_stats()
+        if stats is None:
+            return response
+        budgets = app.config['QUERY_BUDGETS']
+        budget = budgets.get(request.endpoint, app.config['QUERY_BUDGET_DEFAULT'])
+        if budget is not None and stats.queries > budget:
+            message = 'Query budget exceeded for {}: {} queries (budget {})'.format(
+                request.endpoint, stats.queries, budget)
+            if app.config['QUERY_BUDGET_MODE'] == 'raise':
+                raise QueryBudgetExceeded(message)
+            app.logger.warning(message)
+        return response
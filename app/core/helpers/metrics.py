@@ -0,0 +1,151 @@
+'''
+Prometheus metrics served from /metrics
+
+When the `prometheus_multiproc_dir` environment variable points to a shared,
+writable directory every worker process writes its samples there and the
+/metrics route aggregates all of them, whichever worker answers the scrape.
+'''
+import os
+import time
+
+from flask import Response, g, request, template_rendered, before_render_template
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess
+)
+from sqlalchemy import event
+
+from .instrumentation import current_stats
+
+
+REQUESTS = Counter(
+    'fyyur_http_requests_total', 'HTTP requests handled',
+    ['method', 'endpoint', 'status'])
+REQUEST_LATENCY = Histogram(
+    'fyyur_http_request_duration_seconds', 'Time spent handling a request',
+    ['endpoint'],
+    buckets=(.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10))
+REQUEST_DB_TIME = Histogram(
+    'fyyur_http_request_db_seconds', 'Time spent in SQL statements per request',
+    ['endpoint'],
+    buckets=(.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5))
+REQUEST_DB_SHARE = Histogram(
+    'fyyur_http_request_db_ratio', 'Share of the request time spent in SQL',
+    ['endpoint'],
+    buckets=(.1, .2, .3, .4, .5, .6, .7, .8, .9, 1))
+TEMPLATE_RENDER_TIME = Histogram(
+    'fyyur_template_render_seconds', 'Time spent rendering a template',
+    ['template'],
+    buckets=(.001, .0025, .005, .01, .025, .05, .1, .25, .5))
+
+POOL_CHECKOUTS = Counter(
+    'fyyur_db_pool_checkouts_total', 'Connections checked out of the pool')
+POOL_OVERFLOW_CHECKOUTS = Counter(
+    'fyyur_db_pool_overflow_checkouts_total',
+    'Checkouts served by an overflow connection')
+POOL_CHECKED_OUT = Gauge(
+    'fyyur_db_pool_checked_out', 'Connections currently checked out',
+    multiprocess_mode='livesum')
+POOL_OVERFLOW = Gauge(
+    'fyyur_db_pool_overflow', 'Overflow connections currently open',
+    multiprocess_mode='livesum')
+
+
+TASK_QUEUE_DEPTH = Gauge(
+    'fyyur_task_queue_depth', 'Background tasks waiting for a worker',
+    multiprocess_mode='livesum')
+TASKS = Counter(
+    'fyyur_tasks_total', 'Background task attempts',
+    ['task', 'outcome'])
+TASK_WAIT = Histogram(
+    'fyyur_task_wait_seconds', 'Time a background task waited in the queue',
+    ['task'],
+    buckets=(.001, .005, .01, .05, .1, .5, 1, 5, 10, 30))
+TASK_LATENCY = Histogram(
+    'fyyur_task_duration_seconds', 'Time spent running a background task',
+    ['task'],
+    buckets=(.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5))
+
+
+def _registry():
+    if 'prometheus_multiproc_dir' in os.environ:
+        # A fresh registry per scrape that merges the files of all workers
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def _endpoint():
+    # Unmatched paths share one label to keep the series count bounded
+    return request.endpoint or 'unmatched'
+
+
+def _observe_pool(pool):
+    # Only QueuePool tracks checkouts and overflow
+    if hasattr(pool, 'checkedout'):
+        POOL_CHECKED_OUT.set(pool.checkedout())
+    if hasattr(pool, 'overflow'):
+        POOL_OVERFLOW.set(max(pool.overflow(), 0))
+
+
+def _instrument_pool(pool):
+    @event.listens_for(pool, 'checkout')
+    def count_checkout(dbapi_connection, connection_record, connection_proxy):
+        POOL_CHECKOUTS.inc()
+        if hasattr(pool, 'overflow') and pool.overflow() > 0:
+            POOL_OVERFLOW_CHECKOUTS.inc()
+        _observe_pool(pool)
+
+    @event.listens_for(pool, 'checkin')
+    def count_checkin(dbapi_connection, connection_record):
+        _observe_pool(pool)
+
+
+def init_metrics(app, db):
+    '''
+    Record request counts, latency, DB time, template render time and pool
+    usage, and expose them in the Prometheus text format at /metrics.
+    '''
+    if not app.config['METRICS_ENABLED']:
+        return
+
+    with app.app_context():
+        _instrument_pool(db.engine.pool)
+
+    @before_render_template.connect_via(app)
+    def start_render(sender, template, context, **extra):
+        g.setdefault('render_started', []).append(time.perf_counter())
+
+    @template_rendered.connect_via(app)
+    def finish_render(sender, template, context, **extra):
+        started = g.get('render_started')
+        if started:
+            TEMPLATE_RENDER_TIME.labels(template.name or 'string').observe(
+                time.perf_counter() - started.pop())
+
+    @app.after_request
+    def record_request_metrics(response):
+        stats = current_stats()
+        if stats is None:
+            return response
+        endpoint = _endpoint()
+        elapsed = stats.elapsed
+        REQUESTS.labels(request.method, endpoint, response.status_code).inc()
+        REQUEST_LATENCY.labels(endpoint).observe(elapsed)
+        REQUEST_DB_TIME.labels(endpoint).observe(stats.db_time)
+        if elapsed > 0:
+            REQUEST_DB_SHARE.labels(endpoint).observe(
+                min(stats.db_time / elapsed, 1))
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(generate_latest(_registry()),
+                        headers={'Content-Type': CONTENT_TYPE_LATEST})
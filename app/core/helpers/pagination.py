@@ -0,0 +1,69 @@
+'''
+Helpers for keyset (seek) pagination cursors
+'''
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import desc, tuple_
+
+
+def encode_cursor(values):
+    # Opaque, URL-safe token holding the sort key of the last row on a page
+    payload = json.dumps(
+        values, separators=(',', ':'),
+        default=lambda value: value.isoformat()).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, length):
+    # The sort key values of a cursor, which must hold `length` of them
+    if not token:
+        return None
+    try:
+        padding = '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(token + padding))
+    except (TypeError, ValueError):
+        raise ValueError('Invalid pagination cursor supplied')
+    if not isinstance(values, list) or len(values) != length:
+        raise ValueError('Invalid pagination cursor supplied')
+    return values
+
+
+def _coerce(column, value):
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    if python_type is datetime and isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            raise ValueError('Invalid pagination cursor supplied')
+    if not isinstance(value, python_type):
+        raise ValueError('Invalid pagination cursor supplied')
+    return value
+
+
+def paginate(query, columns, cursor, limit, row_key, descending=False):
+    '''
+    Return one page of a query ordered by columns, and the cursor of the
+    next page (None on the last page).
+
+    Rows are selected with a row-value comparison against the sort key of
+    the previous page's last row, so with an index on columns every page
+    is an index range scan of `limit` rows, however deep it is.
+    '''
+    key = tuple_(*columns)
+    after = decode_cursor(cursor, len(columns))
+    if after is not None:
+        after = tuple(
+            _coerce(column, value) for column, value in zip(columns, after))
+        query = query.filter(key < after if descending else key > after)
+    order = [desc(column) for column in columns] if descending else columns
+    rows = query.order_by(*order).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(list(row_key(rows[-1])))
+    return rows, next_cursor
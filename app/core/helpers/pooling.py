@@ -0,0 +1,86 @@
+'''
+Connection pool monitoring and statement timeouts
+
+Pool size, overflow, recycle, pre-ping and the PostgreSQL statement
+timeout are engine options set in config.py. This module adds what can't
+be expressed as an option: a statement timeout for SQLite, a warning with
+the pool statistics when the pool runs out of connections, and a 503 for
+requests that timed out waiting for one.
+'''
+import time
+
+from flask import jsonify, render_template, request
+from sqlalchemy import event, exc
+
+
+def _sqlite_statement_timeout(engine, timeout):
+    # SQLite has no statement timeout; a progress handler aborts the
+    # running statement once it has run past its deadline.
+    @event.listens_for(engine, 'connect')
+    def install_progress_handler(dbapi_connection, connection_record):
+        info = connection_record.info
+
+        def past_deadline():
+            deadline = info.get('statement_deadline')
+            return deadline is not None and time.monotonic() > deadline
+
+        dbapi_connection.set_progress_handler(past_deadline, 1000)
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def start_deadline(conn, cursor, statement, parameters, context, executemany):
+        conn.info['statement_deadline'] = time.monotonic() + timeout
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def clear_deadline(conn, cursor, statement, parameters, context, executemany):
+        conn.info.pop('statement_deadline', None)
+
+
+def _watch_exhaustion(app, pool):
+    # Only QueuePool has a size limit, and none with unlimited overflow
+    if not hasattr(pool, 'overflow') or pool._max_overflow < 0:
+        return
+    limit = pool.size() + pool._max_overflow
+    exhausted = [False]
+
+    @event.listens_for(pool, 'checkout')
+    def warn_when_exhausted(dbapi_connection, connection_record, connection_proxy):
+        if pool.checkedout() >= limit and not exhausted[0]:
+            exhausted[0] = True
+            app.logger.warning(
+                'Connection pool exhausted, further checkouts wait up to '
+                '%ss: %s', pool.timeout(), pool.status())
+
+    @event.listens_for(pool, 'checkin')
+    def reset_exhausted(dbapi_connection, connection_record):
+        # The connection being checked in is still counted
+        if exhausted[0] and pool.checkedout() <= limit:
+            exhausted[0] = False
+
+
+def init_pooling(app, db):
+    '''
+    Apply the SQLite statement timeout and log connection pool exhaustion,
+    on the primary and on the replicas.
+    '''
+    with app.app_context():
+        engine = db.engine
+        engines = [engine] + [
+            db.get_engine(app, bind=bind)
+            for bind in sorted(app.config.get('SQLALCHEMY_BINDS') or {})]
+    timeout = app.config['DB_STATEMENT_TIMEOUT']
+    for bound in engines:
+        if bound.dialect.name == 'sqlite' and timeout:
+            _sqlite_statement_timeout(bound, timeout / 1000)
+        _watch_exhaustion(app, bound.pool)
+
+    @app.errorhandler(exc.TimeoutError)
+    def pool_timeout(error):
+        app.logger.error('Timed out waiting for a database connection: %s',
+                         engine.pool.status())
+        if request.blueprint == 'api':
+            response = jsonify({'error': 'The service is busy, try again later'})
+        else:
+            response = app.make_response(render_template('errors/500.html'))
+        response.status_code = 503
+        response.headers['Retry-After'] = str(app.config['DB_POOL_RETRY_AFTER'])
+        return response
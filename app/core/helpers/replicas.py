@@ -0,0 +1,131 @@
+'''
+Read replica routing
+
+With SQLALCHEMY_REPLICA_URIS set, the DBApi methods marked @replica_read
+run against a replica when called while serving a GET request. Each
+request reads from one replica, picked round-robin, so all its reads see
+the same replication state. A replica that fails is skipped for
+DB_REPLICA_RETRY seconds while the request reads from the primary.
+Everything else (writes, non-GET requests, CLI commands) uses the primary,
+and so do a client's reads for READ_YOUR_WRITES seconds after it changed
+something, so it doesn't miss its own writes while the replicas catch up.
+'''
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, g, has_request_context, request, session
+from flask_sqlalchemy import SignallingSession
+from sqlalchemy import exc
+
+from app import db
+
+
+class RoutingSession(SignallingSession):
+
+    def get_bind(self, mapper=None, clause=None):
+        replica = self.info.get('replica')
+        if replica is not None:
+            return replica
+        return super().get_bind(mapper, clause)
+
+
+class ReplicaSet:
+    '''
+    Round-robin over the replica engines that haven't failed recently.
+    '''
+
+    def __init__(self, engines, retry):
+        self.engines = engines
+        self.retry = retry
+        self._down_until = {}
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def choose(self):
+        now = time.monotonic()
+        with self._lock:
+            for _ in range(len(self.engines)):
+                engine = self.engines[self._next % len(self.engines)]
+                self._next += 1
+                if self._down_until.get(engine, 0) <= now:
+                    return engine
+        return None
+
+    def mark_down(self, engine):
+        with self._lock:
+            self._down_until[engine] = time.monotonic() + self.retry
+
+
+def _replica_set():
+    return current_app.extensions.get('replicas')
+
+
+def _reads_from_replica():
+    return (
+        has_request_context()
+        and request.method in ('GET', 'HEAD')
+        and session.get('primary_until', 0) <= time.time())
+
+
+def _request_replica(replicas):
+    # Picked by the request's first replica read and kept until it ends;
+    # None once it has failed
+    if 'replica' not in g:
+        g.replica = replicas.choose()
+    return g.replica
+
+
+def replica_read(method):
+    '''
+    Run a read-only DBApi method on a replica when one can serve it.
+    '''
+    @wraps(method)
+    def wrapper(*args, **kwargs):
+        replicas = _replica_set()
+        current = db.session()
+        # Nested reads stay on the replica their caller picked
+        if replicas is None or 'replica' in current.info or not _reads_from_replica():
+            return method(*args, **kwargs)
+        replica = _request_replica(replicas)
+        if replica is None:
+            return method(*args, **kwargs)
+        current.info['replica'] = replica
+        try:
+            return method(*args, **kwargs)
+        except exc.DBAPIError as error:
+            if not (error.connection_invalidated or isinstance(error, exc.OperationalError)):
+                raise
+            replicas.mark_down(replica)
+            g.replica = None
+            current_app.logger.warning(
+                'Replica %s failed, reading from the primary for %ss: %s',
+                replica.url, replicas.retry, error)
+        finally:
+            current.info.pop('replica', None)
+        return method(*args, **kwargs)
+    return wrapper
+
+
+def init_read_replicas(app, db):
+    '''
+    Route replica reads to the SQLALCHEMY_REPLICA_URIS binds and send a
+    client's reads to the primary for a while after each of its writes.
+    '''
+    binds = sorted(app.config.get('SQLALCHEMY_BINDS') or {})
+    replica_binds = [bind for bind in binds if bind.startswith('replica_')]
+    if not replica_binds:
+        return
+    with app.app_context():
+        engines = [db.get_engine(app, bind=bind) for bind in replica_binds]
+    app.extensions['replicas'] = ReplicaSet(engines, app.config['DB_REPLICA_RETRY'])
+    # Flask-SQLAlchemy creates its sessions from this factory, shared by
+    # all applications; the routing session only differs while a replica
+    # read of an application with replicas runs
+    db.session.session_factory.class_ = RoutingSession
+
+    @app.after_request
+    def remember_write(response):
+        if request.method not in ('GET', 'HEAD', 'OPTIONS') and response.status_code < 400:
+            session['primary_until'] = time.time() + app.config['READ_YOUR_WRITES']
+        return response
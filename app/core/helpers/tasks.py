@@ -0,0 +1,172 @@
+'''
+Background tasks run after commit
+
+Work registered with after_commit() is queued when the session's
+transaction commits and dropped if it rolls back. Worker threads run each
+task in its own application context and transaction; when the queue is
+full, the committing thread runs it instead.
+'''
+import atexit
+import queue
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app import db
+from .metrics import TASKS, TASK_LATENCY, TASK_QUEUE_DEPTH, TASK_WAIT
+
+_STOP = object()
+
+
+def _name(fn):
+    return getattr(fn, '__qualname__', repr(fn))
+
+
+class BackgroundExecutor:
+    '''
+    A bounded queue served by a pool of worker threads.
+    '''
+
+    def __init__(self, app, workers, queue_size, retries, backoff, drain_timeout):
+        self.app = app
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+        self.drain_timeout = drain_timeout
+        self._queue = queue.Queue(queue_size)
+        self._closed = False
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def _start(self):
+        # Apps that never queue a task (tests, most CLI commands) don't
+        # start any threads
+        with self._lock:
+            if self._threads:
+                return
+            self._threads = [
+                threading.Thread(target=self._work, name='task-worker-{}'.format(n), daemon=True)
+                for n in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+            atexit.register(self.shutdown, self.drain_timeout)
+
+    def submit(self, fn, *args):
+        task = (fn, args, time.monotonic())
+        if self.workers and not self._closed:
+            self._start()
+            # Counted before a worker can take the task off and decrement it
+            TASK_QUEUE_DEPTH.inc()
+            try:
+                self._queue.put_nowait(task)
+                return
+            except queue.Full:
+                TASK_QUEUE_DEPTH.dec()
+                self.app.logger.warning('Task queue full, running %s in the caller', _name(fn))
+        # A thread of its own gets its own session, apart from the caller's
+        runner = threading.Thread(target=self._run, args=(task,))
+        runner.start()
+        runner.join()
+
+    def _work(self):
+        while True:
+            task = self._queue.get()
+            try:
+                if task is _STOP:
+                    return
+                TASK_QUEUE_DEPTH.dec()
+                self._run(task)
+            finally:
+                self._queue.task_done()
+
+    def _run(self, task):
+        fn, args, queued_at = task
+        name = _name(fn)
+        TASK_WAIT.labels(name).observe(time.monotonic() - queued_at)
+        for attempt in range(self.retries + 1):
+            started = time.perf_counter()
+            try:
+                with self.app.app_context():
+                    fn(*args)
+                    # Each task writes in a transaction of its own
+                    db.session.commit()
+            except Exception:
+                TASK_LATENCY.labels(name).observe(time.perf_counter() - started)
+                if attempt == self.retries:
+                    TASKS.labels(name, 'failed').inc()
+                    self.app.logger.exception(
+                        'Task %s failed after %s attempts', name, attempt + 1)
+                    return
+                TASKS.labels(name, 'retried').inc()
+                time.sleep(self.backoff * 2 ** attempt)
+            else:
+                TASK_LATENCY.labels(name).observe(time.perf_counter() - started)
+                TASKS.labels(name, 'done').inc()
+                return
+
+    def shutdown(self, timeout=None):
+        # Stop taking tasks and wait for the workers to finish the queued ones
+        self._closed = True
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        def remaining():
+            return None if deadline is None else max(deadline - time.monotonic(), 0)
+
+        try:
+            for _ in self._threads:
+                self._queue.put(_STOP, timeout=remaining())
+        except queue.Full:
+            pass
+        for thread in self._threads:
+            thread.join(remaining())
+        left = self._queue.qsize()
+        if any(thread.is_alive() for thread in self._threads) and left:
+            self.app.logger.warning('Shut down with %s background tasks left', left)
+
+
+def after_commit(fn, *args):
+    '''
+    Run fn(*args) in the background once the current transaction commits.
+    '''
+    db.session.info.setdefault('pending_tasks', []).append((fn, args))
+
+
+def _committed(session):
+    pending = session.info.pop('pending_tasks', None)
+    if pending:
+        session.info.setdefault('committed_tasks', []).extend(pending)
+
+
+def _submit_committed(session, transaction):
+    # Submitted once the transaction has released its connections, to the
+    # executor of the session's application
+    if transaction.parent is not None:
+        return
+    session.info.pop('pending_tasks', None)
+    committed = session.info.pop('committed_tasks', None)
+    if committed:
+        executor = session.app.extensions['tasks']
+        for fn, args in committed:
+            executor.submit(fn, *args)
+
+
+def init_tasks(app):
+    '''
+    Start the background workers, queue tasks registered with after_commit
+    when their transaction commits, and drain the queue on shutdown.
+    '''
+    executor = BackgroundExecutor(
+        app,
+        workers=app.config['TASK_WORKERS'],
+        queue_size=app.config['TASK_QUEUE_SIZE'],
+        retries=app.config['TASK_RETRIES'],
+        backoff=app.config['TASK_RETRY_BACKOFF'],
+        drain_timeout=app.config['TASK_DRAIN_TIMEOUT'])
+    app.extensions['tasks'] = executor
+    # The listeners are shared by all applications
+    if not event.contains(Session, 'after_commit', _committed):
+        event.listen(Session, 'after_commit', _committed)
+        event.listen(Session, 'after_transaction_end', _submit_committed)
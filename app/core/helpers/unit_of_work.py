@@ -0,0 +1,70 @@
+'''
+Request-scoped unit of work
+
+While a request is handled with REQUEST_SCOPED_SESSION on, DBApi methods
+share the request's session and connection: writes are only flushed, and
+the whole request is committed (or rolled back) once when the response is
+ready. Outside of requests (CLI commands, imports) every DBApi method
+still commits and closes its own session.
+'''
+from flask import g, has_request_context, render_template, session
+
+from app import db
+
+
+def in_unit_of_work():
+    return has_request_context() and g.get('unit_of_work', False)
+
+
+def commit_unit():
+    # Commits now, or defers the commit to the end of the request
+    if in_unit_of_work():
+        db.session.flush()
+    else:
+        db.session.commit()
+
+
+def release_session():
+    # The request's session is removed on teardown
+    if not in_unit_of_work():
+        db.session.close()
+
+
+def init_unit_of_work(app):
+    '''
+    Commit the request's writes once after a successful response and roll
+    them back after an error response or an unhandled exception.
+    '''
+    if not app.config['REQUEST_SCOPED_SESSION']:
+        return
+
+    @app.before_request
+    def begin_unit_of_work():
+        g.unit_of_work = True
+
+    @app.after_request
+    def finish_unit_of_work(response):
+        if not g.get('unit_of_work'):
+            return response
+        # Streamed responses keep reading after this point on their own
+        # sessions
+        g.unit_of_work = False
+        try:
+            if response.status_code < 400:
+                db.session.commit()
+            else:
+                db.session.rollback()
+        except Exception:
+            db.session.rollback()
+            app.logger.exception('Could not commit the request')
+            # The view has already flashed its success message
+            session.pop('_flashes', None)
+            return app.make_response((render_template('errors/500.html'), 500))
+        return response
+
+    @app.teardown_request
+    def abort_unit_of_work(exception):
+        # after_request doesn't run when the view raised
+        if g.get('unit_of_work'):
+            g.unit_of_work = False
+            db.session.rollback()
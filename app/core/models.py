@@ -1,23 +1,28 @@
+from datetime import datetime
+
 from app import db
 
 
 show = db.Table(
     'Show',
-    db.Column('venue_id', db.Integer, db.ForeignKey('Venue.id'), nullable=False),
-    db.Column('artist_id', db.Integer, db.ForeignKey('Artist.id'), nullable=False),
+    db.Column('venue_id', db.Integer, db.ForeignKey('Venue.id', ondelete='CASCADE'), nullable=False),
+    db.Column('artist_id', db.Integer, db.ForeignKey('Artist.id', ondelete='CASCADE'), nullable=False),
     db.Column('start_time', db.DateTime, nullable=False),
-    db.Column('id', db.Integer, primary_key=True)
+    db.Column('id', db.Integer, primary_key=True),
+    db.Index('ix_show_venue_id_start_time', 'venue_id', 'start_time'),
+    db.Index('ix_show_artist_id_start_time', 'artist_id', 'start_time'),
+    db.Index('ix_show_start_time_id', 'start_time', 'id')
 )
 
 genre_artist = db.Table(
     'GenreArtist',
-    db.Column('artist_id', db.Integer, db.ForeignKey('Artist.id'), primary_key=True),
+    db.Column('artist_id', db.Integer, db.ForeignKey('Artist.id', ondelete='CASCADE'), primary_key=True),
     db.Column('genre_id', db.Integer, db.ForeignKey('Genre.id'), primary_key=True),
 )
 
 genre_venue = db.Table(
     'GenreVenue',
-    db.Column('venue_id', db.Integer, db.ForeignKey('Venue.id'), primary_key=True),
+    db.Column('venue_id', db.Integer, db.ForeignKey('Venue.id', ondelete='CASCADE'), primary_key=True),
     db.Column('genre_id', db.Integer, db.ForeignKey('Genre.id'), primary_key=True),
 )
 
@@ -31,8 +36,17 @@ class Base(db.Model):
     image_link = db.Column(db.String(500))
     website = db.Column(db.String())
     facebook_link = db.Column(db.String(120))
-    created_at = db.Column(db.DateTime, default=db.func.now())
-    updated_at = db.Column(db.DateTime, default=db.func.now())
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    # Bumped on every edit, and when a show partner's name or image changes
+    # (see DBApi.touch_show_partners); with the show summary below it
+    # validates cached detail pages
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+    # Show summary maintained by DBApi.refresh_show_counts/roll_show_counts
+    upcoming_shows_count = db.Column(db.Integer, default=0, nullable=False)
+    past_shows_count = db.Column(db.Integer, default=0, nullable=False)
+    next_show_time = db.Column(db.DateTime, index=True)
+    # Soft-deleted rows are hidden from every DBApi read
+    deleted = db.Column(db.Boolean, default=False, server_default=db.false(), nullable=False, index=True)
 
 
 class Venue(Base):
@@ -40,8 +54,8 @@ class Venue(Base):
 
     seeking_talent = db.Column(db.Boolean, default=False, nullable=False)
     seeking_description = db.Column(db.String())
-    address = db.relationship('Address', uselist=False, cascade="all, delete-orphan, delete", back_populates="venue", lazy=True)
-    genres = db.relationship('Genre', secondary=genre_venue, lazy=True, backref=db.backref('venues', lazy=True))
+    address = db.relationship('Address', uselist=False, cascade="all, delete-orphan, delete", back_populates="venue", lazy=True, passive_deletes=True)
+    genres = db.relationship('Genre', secondary=genre_venue, lazy=True, passive_deletes=True, backref=db.backref('venues', lazy=True))
 
 
 class Artist(Base):
@@ -50,8 +64,8 @@ class Artist(Base):
     seeking_venue = db.Column(db.Boolean, default=False, nullable=False)
     seeking_description = db.Column(db.String())
     city_id = db.Column(db.Integer, db.ForeignKey('City.id'), nullable=False)
-    venues = db.relationship('Venue', secondary=show, lazy=True, backref=db.backref('artists', lazy=True))
-    genres = db.relationship('Genre', secondary=genre_artist, lazy=True, backref=db.backref('artists', lazy=True))
+    venues = db.relationship('Venue', secondary=show, lazy=True, passive_deletes=True, backref=db.backref('artists', lazy=True, passive_deletes=True))
+    genres = db.relationship('Genre', secondary=genre_artist, lazy=True, passive_deletes=True, backref=db.backref('artists', lazy=True))
 
 
 class Genre(db.Model):
@@ -86,5 +100,29 @@ class Address(db.Model):
     house_number = db.Column(db.Integer, nullable=False)
     street = db.Column(db.String(120), nullable=False)
     city_id = db.Column(db.Integer, db.ForeignKey('City.id'), nullable=False)
-    venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id', onupdate="CASCADE"), nullable=False)
+    venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id', onupdate="CASCADE", ondelete="CASCADE"), nullable=False)
     venue = db.relationship('Venue', back_populates="address", lazy=True)
+
+    __table_args__ = (
+        db.Index('ix_address_city_id_venue_id', 'city_id', 'venue_id'),
+    )
+
+
+class ImportProgress(db.Model):
+    __tablename__ = 'ImportProgress'
+
+    # Records of a file imported by `flask core import` so far, committed
+    # together with each batch
+    source = db.Column(db.String(500), primary_key=True)
+    kind = db.Column(db.String(20), primary_key=True)
+    records = db.Column(db.Integer, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+
+
+# Functional indexes backing the case-insensitive lookups in DBApi.create/edit
+db.Index(
+    'ix_city_lower_name_state_id',
+    db.func.lower(City.name), City.state_id)
+db.Index(
+    'ix_address_lower_street_house_number_city_id',
+    db.func.lower(Address.street), Address.house_number, Address.city_id)
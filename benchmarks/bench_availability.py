@@ -0,0 +1,88 @@
+'''
+Venue availability search at growing show counts.
+
+Seeds a fresh catalog for every --shows size and times
+DBApi.find_available_venues for random (city, genre, date) searches. The
+search only probes indexes per venue of the city, so its cost should stay
+flat while the Show table grows.
+
+    $ python -m benchmarks.bench_availability --shows 10000 100000 300000
+'''
+import argparse
+import os
+import random
+import statistics
+import string
+import tempfile
+import time
+from datetime import date, timedelta
+from itertools import product
+
+from benchmarks.catalog import GENRES
+from benchmarks.run import setup_app
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--shows', type=int, nargs='+', default=[10000, 100000],
+                        help='show counts to measure (default 10000 100000)')
+    parser.add_argument('--venues', type=int, default=5000)
+    parser.add_argument('--artists', type=int, default=10000)
+    parser.add_argument('--cities', type=int, default=50)
+    parser.add_argument('--searches', type=int, default=200,
+                        help='timed searches per show count (default 200)')
+    return parser.parse_args(argv)
+
+
+def searches(count, cities, states, seed=0):
+    rng = random.Random(seed)
+    codes = [''.join(pair) for pair in product(string.ascii_uppercase, repeat=2)]
+    today = date.today()
+    for _ in range(count):
+        city = rng.randint(1, cities)
+        yield {
+            'city': 'City {}'.format(city),
+            'state': codes[(city - 1) % states],
+            'genre': rng.choice(GENRES + [None]),
+            'day': today + timedelta(days=rng.randint(-365, 365)),
+        }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    directory = tempfile.mkdtemp(prefix='fyyur-bench-')
+    os.environ.setdefault('SQL_INSTRUMENTATION_LOG', 'false')
+    app, db = setup_app('sqlite:///' + os.path.join(directory, 'benchmark.db'))
+    from benchmarks.catalog import seed_catalog
+    from app.core.helpers.database import DBApi
+
+    print('{:>8} {:>9} {:>9} {:>9} {:>8}'.format(
+        'shows', 'p50 ms', 'p95 ms', 'max ms', 'venues'))
+    for shows in args.shows:
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            sizes = seed_catalog({
+                'venues': args.venues, 'artists': args.artists,
+                'cities': args.cities, 'shows': shows})
+        timings = []
+        found = 0
+        for search in searches(args.searches, sizes['cities'], sizes['states']):
+            with app.test_request_context():
+                started = time.perf_counter()
+                result = DBApi.find_available_venues(
+                    search['city'], search['state'], search['day'],
+                    genre=search['genre'], limit=50)
+                timings.append(time.perf_counter() - started)
+            found += result['page_count']
+        timings.sort()
+        print('{:>8} {:>9.2f} {:>9.2f} {:>9.2f} {:>8.1f}'.format(
+            shows,
+            statistics.median(timings) * 1000,
+            timings[int(len(timings) * 0.95) - 1] * 1000,
+            timings[-1] * 1000,
+            found / len(timings)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+'''
+Response compression savings and CPU cost per route.
+
+Requests the HTML pages and JSON API listings of a seeded catalog without
+compression, with gzip and with brotli, and reports the bytes sent, the
+CPU time spent compressing each response and, for scale, the CPU time of
+the whole uncompressed request. Responses below COMPRESS_MIN_SIZE are sent
+uncompressed and show no savings.
+
+    $ python -m benchmarks.bench_compression --level 6 --brotli-level 4
+'''
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks.catalog import DEFAULT_SIZES
+from benchmarks.run import setup_app
+
+ROUTES = [
+    '/',
+    '/venues',
+    '/artists',
+    '/shows',
+    '/venues/1',
+    '/artists/1',
+    '/api/v1/venues?limit=100',
+    '/api/v1/shows?limit=100',
+]
+
+ENCODINGS = ['identity', 'gzip', 'br']
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=20,
+                        help='requests per route and encoding (default 20)')
+    parser.add_argument('--level', type=int, help='gzip level (COMPRESS_LEVEL)')
+    parser.add_argument('--brotli-level', type=int,
+                        help='brotli quality (COMPRESS_BROTLI_LEVEL)')
+    parser.add_argument('--venues', type=int, default=DEFAULT_SIZES['venues'])
+    parser.add_argument('--artists', type=int, default=DEFAULT_SIZES['artists'])
+    parser.add_argument('--shows', type=int, default=DEFAULT_SIZES['shows'])
+    return parser.parse_args(argv)
+
+
+def cpu_ms(run, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.process_time()
+        run()
+        timings.append(time.process_time() - started)
+    return statistics.median(timings) * 1000
+
+
+def fetch(client, url, encoding):
+    response = client.get(url, headers={'Accept-Encoding': encoding})
+    assert response.status_code == 200, (url, response.status_code)
+    return response.get_data()
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    directory = tempfile.mkdtemp(prefix='fyyur-bench-')
+    os.environ.setdefault('SQL_INSTRUMENTATION_LOG', 'false')
+    app, db = setup_app('sqlite:///' + os.path.join(directory, 'benchmark.db'))
+    from benchmarks.catalog import seed_catalog
+    from app.core.helpers import compression
+
+    if compression.brotli is None:
+        ENCODINGS.remove('br')
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        seed_catalog({'venues': args.venues, 'artists': args.artists, 'shows': args.shows})
+    app.config['QUERY_BUDGET_MODE'] = 'log'
+    if args.level is not None:
+        app.config['COMPRESS_LEVEL'] = args.level
+    if args.brotli_level is not None:
+        app.config['COMPRESS_BROTLI_LEVEL'] = args.brotli_level
+
+    client = app.test_client()
+    header = '{:<26} {:>9} {:>10}'.format('route', 'bytes', 'request ms')
+    for encoding in ENCODINGS[1:]:
+        header += ' {:>9} {:>6} {:>8}'.format(encoding, 'saved', 'cpu ms')
+    print(header)
+    for url in ROUTES:
+        body = fetch(client, url, 'identity')  # also warms up caches
+        line = '{:<26} {:>9} {:>10.2f}'.format(
+            url, len(body),
+            cpu_ms(lambda: fetch(client, url, 'identity'), args.repeat))
+        for encoding in ENCODINGS[1:]:
+            size = len(fetch(client, url, encoding))
+            if size < len(body):
+                cost = cpu_ms(lambda: compression._compress(
+                    body, encoding, app.config), args.repeat)
+            else:
+                cost = 0
+            line += ' {:>9} {:>5.0f}% {:>8.3f}'.format(
+                size, (1 - size / len(body)) * 100, cost)
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+'''
+Concurrent throughput of the read-only catalog pages.
+
+Serves the venue directory, venue and artist detail pages, the shows list
+and venue search from a pool of client threads against one in-process
+application, as a threaded worker (e.g. gunicorn --worker-class gthread)
+would, and reports requests per second and latency for each level of
+concurrency.
+
+SQLite answers from the local disk cache, so there is little waiting to
+overlap; --db-latency adds a simulated network round trip to every SQL
+statement to model a remote database server.
+
+    $ python -m benchmarks.bench_concurrency --threads 1 2 4 8 --db-latency 2
+'''
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.catalog import DEFAULT_SIZES
+from benchmarks.run import setup_app
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4, 8],
+                        help='concurrency levels to measure (default 1 2 4 8)')
+    parser.add_argument('--requests', type=int, default=400,
+                        help='requests per concurrency level (default 400)')
+    parser.add_argument('--db-latency', type=float, default=0,
+                        help='simulated round trip per SQL statement, in ms')
+    parser.add_argument('--venues', type=int, default=DEFAULT_SIZES['venues'])
+    parser.add_argument('--artists', type=int, default=DEFAULT_SIZES['artists'])
+    parser.add_argument('--shows', type=int, default=DEFAULT_SIZES['shows'])
+    parser.add_argument('--database', help='SQLAlchemy URI of an empty database')
+    return parser.parse_args(argv)
+
+
+def requests_for(sizes, count):
+    # A fixed mix of the read-only pages, cycling through ids
+    pages = []
+    for n in range(count):
+        venue_id = n % sizes['venues'] + 1
+        artist_id = n % sizes['artists'] + 1
+        pages.append([
+            ('GET', '/venues', None),
+            ('GET', '/venues/{}'.format(venue_id), None),
+            ('GET', '/artists/{}'.format(artist_id), None),
+            ('GET', '/shows', None),
+            ('POST', '/venues/search', {'search_term': 'venue {}'.format(venue_id)}),
+        ][n % 5])
+    return pages
+
+
+def run_level(app, pages, threads):
+    local = threading.local()
+
+    def fetch(page):
+        if not hasattr(local, 'client'):
+            local.client = app.test_client()
+        method, url, data = page
+        started = time.perf_counter()
+        response = local.client.open(url, method=method, data=data)
+        assert response.status_code == 200, (url, response.status_code)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as executor:
+        latencies = list(executor.map(fetch, pages))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        'throughput': len(pages) / elapsed,
+        'p50_ms': statistics.median(latencies) * 1000,
+        'p95_ms': latencies[int(len(latencies) * 0.95) - 1] * 1000,
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.database:
+        database = args.database
+    else:
+        # A file database: threads need their own connections
+        directory = tempfile.mkdtemp(prefix='fyyur-bench-')
+        database = 'sqlite:///' + os.path.join(directory, 'benchmark.db')
+    os.environ.setdefault('SQL_INSTRUMENTATION_LOG', 'false')
+    app, db = setup_app(database)
+    from benchmarks.catalog import seed_catalog
+
+    sizes = {'venues': args.venues, 'artists': args.artists, 'shows': args.shows}
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        sizes = seed_catalog(sizes)
+    app.config['QUERY_BUDGET_MODE'] = 'log'
+
+    if args.db_latency:
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+
+        @event.listens_for(Engine, 'before_cursor_execute')
+        def round_trip(*_):
+            time.sleep(args.db_latency / 1000)
+
+    pages = requests_for(sizes, args.requests)
+    run_level(app, pages[:50], 1)  # warm up caches and connections
+    print('{:>8} {:>10} {:>9} {:>9} {:>8}'.format(
+        'threads', 'req/s', 'p50 ms', 'p95 ms', 'speedup'))
+    baseline = None
+    for threads in args.threads:
+        result = run_level(app, pages, threads)
+        baseline = baseline or result['throughput']
+        print('{:>8} {:>10.1f} {:>9.2f} {:>9.2f} {:>7.2f}x'.format(
+            threads, result['throughput'], result['p50_ms'], result['p95_ms'],
+            result['throughput'] / baseline))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+'''
+Micro-benchmark of the `datetime` template filter.
+
+Compares the per-call cost of the previous implementation (stringify,
+re-parse with dateutil, format with Babel) with format_datetime on native
+datetimes, for a page-sized set of distinct show times rendered repeatedly.
+
+    $ python -m benchmarks.bench_format_datetime
+'''
+import argparse
+import timeit
+from datetime import datetime, timedelta
+
+import babel.dates
+import dateutil.parser
+
+from app import format_datetime, _format_datetime
+
+
+def legacy_format_datetime(value, format='medium'):
+    date = dateutil.parser.parse(value)
+    if format == 'full':
+        format = "EEEE MMMM, d, y 'at' h:mma"
+    elif format == 'medium':
+        format = "EE MM, dd, y h:mma"
+    return babel.dates.format_datetime(date, format)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--values', type=int, default=1000,
+                        help='distinct show times per render')
+    parser.add_argument('--renders', type=int, default=5,
+                        help='times the same page is rendered')
+    args = parser.parse_args()
+
+    start = datetime(2026, 1, 1, 20, 0)
+    values = [start + timedelta(hours=7 * i) for i in range(args.values)]
+    strings = [str(value) for value in values]
+    calls = args.values * args.renders
+
+    for value, string in zip(values, strings):
+        assert format_datetime(value, 'full') == legacy_format_datetime(string, 'full')
+
+    def legacy():
+        for string in strings:
+            legacy_format_datetime(string, 'full')
+
+    def cold():
+        _format_datetime.cache_clear()
+        for value in values:
+            format_datetime(value, 'full')
+
+    def warm():
+        for value in values:
+            format_datetime(value, 'full')
+
+    results = [
+        ('legacy (str -> dateutil -> babel)', timeit.timeit(legacy, number=args.renders)),
+        ('datetime, memo cleared per render', timeit.timeit(cold, number=args.renders)),
+        ('datetime, memoized', timeit.timeit(warm, number=args.renders)),
+    ]
+    baseline = results[0][1]
+    for name, seconds in results:
+        print('{:<36} {:8.2f} us/call  {:6.1f}x'.format(
+            name, seconds / calls * 1e6, baseline / seconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+'''
+Import time and application creation cost.
+
+Imports the app package in a fresh interpreter under `-X importtime`, lists
+the modules with the largest cumulative import time and fails when the
+package takes longer than --budget-ms to import; most of that is Flask
+and Flask-SQLAlchemy, which define the db object. Then times create_app()
+for the first application and for each further isolated instance, as test
+suites and workers create them.
+
+    $ python -m benchmarks.bench_import --budget-ms 600 --instances 20
+'''
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# import time:     self [us] |  cumulative | imported package
+IMPORT_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--budget-ms', type=float, default=600,
+                        help='maximum import time of the app package (default 600)')
+    parser.add_argument('--top', type=int, default=15,
+                        help='modules to list (default 15)')
+    parser.add_argument('--runs', type=int, default=5,
+                        help='fresh interpreters to measure, the median is kept (default 5)')
+    parser.add_argument('--instances', type=int, default=20,
+                        help='isolated applications to create (default 20)')
+    return parser.parse_args(argv)
+
+
+def import_times(module):
+    '''
+    {module: (self us, cumulative us)} of importing `module` in a fresh
+    interpreter, and the total import time in microseconds.
+    '''
+    output = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+        stderr=subprocess.PIPE, universal_newlines=True, check=True).stderr
+    times = {}
+    for match in IMPORT_LINE.finditer(output):
+        times[match.group(4)] = (int(match.group(1)), int(match.group(2)))
+    return times, times[module][1]
+
+
+def create_ms(count):
+    from app import create_app
+    directory = tempfile.mkdtemp(prefix='fyyur-bench-')
+    timings = []
+    for n in range(count):
+        started = time.perf_counter()
+        create_app({
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(directory, '{}.db'.format(n)),
+            'SECRET_KEY': 'benchmark',
+            'TESTING': True,
+        })
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    runs = [import_times('app') for _ in range(args.runs)]
+    times, total = sorted(runs, key=lambda run: run[1])[len(runs) // 2]
+
+    print('{:<50} {:>10} {:>10}'.format('module', 'self ms', 'cumul. ms'))
+    slowest = sorted(times.items(), key=lambda item: item[1][1], reverse=True)
+    for module, (own, cumulative) in slowest[:args.top]:
+        print('{:<50} {:>10.1f} {:>10.1f}'.format(module, own / 1000, cumulative / 1000))
+
+    os.environ.setdefault('SQL_INSTRUMENTATION_LOG', 'false')
+    first, *others = create_ms(args.instances)
+    print()
+    print('import app            {:>8.1f} ms (budget {:.0f} ms)'.format(total / 1000, args.budget_ms))
+    print('first create_app()    {:>8.1f} ms'.format(first))
+    if others:
+        print('next create_app()     {:>8.1f} ms median of {}'.format(
+            statistics.median(others), len(others)))
+    if total / 1000 > args.budget_ms:
+        print('import app exceeds the {:.0f} ms budget'.format(args.budget_ms), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+'''
+Synthetic catalog generator for benchmarks.
+
+Seeds an empty database with states, cities, genres, venues (with
+addresses and genres), artists (with genres) and shows spread around the
+current date, then computes the maintained show counts.
+
+Rows are written through the db session of the current application
+context, so call seed_catalog() inside the app_context() of an application
+made with create_app().
+'''
+import random
+import string
+from datetime import datetime, timedelta
+from itertools import product
+
+GENRES = [
+    'Alternative', 'Blues', 'Classical', 'Country', 'Electronic', 'Folk',
+    'Funk', 'Hip-Hop', 'Heavy Metal', 'Instrumental', 'Jazz',
+    'Musical Theatre', 'Pop', 'Punk', 'R&B', 'Reggae', 'Rock n Roll', 'Soul',
+    'Other'
+]
+
+DEFAULT_SIZES = {
+    'states': 10,
+    'cities': 50,
+    'genres': len(GENRES),
+    'venues': 1000,
+    'artists': 2000,
+    'shows': 20000,
+}
+
+
+def _insert(table, rows):
+    # Multi-row INSERTs that stay below SQLite's bound parameter limit
+    from app import db
+    if not rows:
+        return
+    per_statement = max(1, 999 // len(rows[0]))
+    for start in range(0, len(rows), per_statement):
+        db.session.execute(table.insert().values(rows[start:start + per_statement]))
+
+
+def _genre_links(rng, owner_column, owner_ids, genre_ids):
+    return [
+        {owner_column: owner_id, 'genre_id': genre_id}
+        for owner_id in owner_ids
+        for genre_id in rng.sample(genre_ids, rng.randint(1, min(3, len(genre_ids))))
+    ]
+
+
+def _reset_sequence(table):
+    from app import db
+    db.session.execute(
+        "SELECT setval(pg_get_serial_sequence(:table, 'id'), "
+        "coalesce(max(id), 0) + 1, false) FROM \"{}\"".format(table.name),
+        {'table': '"{}"'.format(table.name)})
+
+
+def seed_catalog(sizes=None, seed=0):
+    '''
+    Populate the (empty) database bound to `db` with a synthetic catalog and
+    return the sizes used. Must be called inside an application context.
+    '''
+    from app import db
+    from app.core.models import (
+        Venue,
+        Artist,
+        Genre,
+        City,
+        State,
+        Address,
+        show,
+        genre_artist,
+        genre_venue
+    )
+    from app.core.helpers.database import DBApi
+
+    sizes = dict(DEFAULT_SIZES, **(sizes or {}))
+    rng = random.Random(seed)
+    now = datetime.now().replace(microsecond=0)
+
+    codes = [''.join(pair) for pair in product(string.ascii_uppercase, repeat=2)]
+    _insert(State.__table__, [
+        {'id': i + 1, 'name': 'State {}'.format(codes[i]), 'code': codes[i]}
+        for i in range(sizes['states'])
+    ])
+    _insert(City.__table__, [
+        {'id': i + 1, 'name': 'City {}'.format(i + 1),
+         'state_id': i % sizes['states'] + 1}
+        for i in range(sizes['cities'])
+    ])
+    genre_names = (GENRES * (sizes['genres'] // len(GENRES) + 1))[:sizes['genres']]
+    genre_names = [
+        name if i < len(GENRES) else '{} {}'.format(name, i)
+        for i, name in enumerate(genre_names)
+    ]
+    _insert(Genre.__table__, [
+        {'id': i + 1, 'name': name} for i, name in enumerate(genre_names)
+    ])
+    genre_ids = list(range(1, sizes['genres'] + 1))
+
+    venue_ids = list(range(1, sizes['venues'] + 1))
+    _insert(Venue.__table__, [
+        {
+            'id': venue_id,
+            'name': 'Venue {}'.format(venue_id),
+            'phone': '415-555-{:04d}'.format(venue_id % 10000),
+            'image_link': 'https://example.com/venues/{}.jpg'.format(venue_id),
+            'website': 'https://example.com/venues/{}'.format(venue_id),
+            'seeking_talent': venue_id % 3 == 0,
+            'seeking_description': 'Looking for local acts',
+            'created_at': now,
+            'updated_at': now,
+        }
+        for venue_id in venue_ids
+    ])
+    _insert(Address.__table__, [
+        {
+            'id': venue_id,
+            'house_number': venue_id,
+            'street': 'Main Street',
+            'city_id': rng.randint(1, sizes['cities']),
+            'venue_id': venue_id,
+        }
+        for venue_id in venue_ids
+    ])
+    _insert(genre_venue, _genre_links(rng, 'venue_id', venue_ids, genre_ids))
+
+    artist_ids = list(range(1, sizes['artists'] + 1))
+    _insert(Artist.__table__, [
+        {
+            'id': artist_id,
+            'name': 'Artist {}'.format(artist_id),
+            'phone': '212-555-{:04d}'.format(artist_id % 10000),
+            'image_link': 'https://example.com/artists/{}.jpg'.format(artist_id),
+            'seeking_venue': artist_id % 2 == 0,
+            'city_id': rng.randint(1, sizes['cities']),
+            'created_at': now - timedelta(minutes=artist_id),
+            'updated_at': now - timedelta(minutes=artist_id),
+        }
+        for artist_id in artist_ids
+    ])
+    _insert(genre_artist, _genre_links(rng, 'artist_id', artist_ids, genre_ids))
+
+    if venue_ids and artist_ids:
+        _insert(show, [
+            {
+                'id': show_id,
+                'venue_id': rng.choice(venue_ids),
+                'artist_id': rng.choice(artist_ids),
+                'start_time': now + timedelta(hours=rng.randint(-24 * 365, 24 * 365)),
+            }
+            for show_id in range(1, sizes['shows'] + 1)
+        ])
+    if db.session.bind.dialect.name == 'postgresql':
+        # Rows were written with explicit ids; move the sequences past them
+        for table in (State, City, Genre, Venue, Address, Artist):
+            _reset_sequence(table.__table__)
+        _reset_sequence(show)
+    db.session.commit()
+    DBApi.roll_show_counts(rebuild=True)
+    DBApi.invalidate_reference_data()
+    return sizes
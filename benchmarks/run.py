@@ -0,0 +1,381 @@
+'''
+Benchmark suite for the DBApi methods and the core_module routes.
+
+Seeds a fresh database with a synthetic catalog, then times every DBApi
+method and every route of the core blueprint (through the Flask test
+client), recording wall time, the number of SQL statements issued and the
+number of connection pool checkouts.
+
+    $ python -m benchmarks.run --save benchmarks/baseline.json
+    $ python -m benchmarks.run --venues 5000 --shows 100000 --compare benchmarks/baseline.json
+
+By default a throwaway SQLite file is used; pass --database to point the
+suite at another (empty) database.
+'''
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.catalog import DEFAULT_SIZES
+
+
+class QueryCounter:
+    '''
+    Counts the SQL statements executed, and the connections checked out,
+    by every engine in the process.
+    '''
+
+    def __init__(self):
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+        from sqlalchemy.pool import Pool
+        self.count = 0
+        self.checkouts = 0
+        event.listen(Engine, 'before_cursor_execute', self._count)
+        event.listen(Pool, 'checkout', self._checkout)
+
+    def _count(self, *args):
+        self.count += 1
+
+    def _checkout(self, *args):
+        self.checkouts += 1
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Time DBApi methods and core routes on a synthetic catalog.')
+    for name, default in DEFAULT_SIZES.items():
+        parser.add_argument('--' + name, type=int, default=default,
+                            help='number of {} (default {})'.format(name, default))
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='timed runs per case (default 5)')
+    parser.add_argument('--database', help='SQLAlchemy URI of an empty database')
+    parser.add_argument('--only', help='only run cases whose name contains this')
+    parser.add_argument('--save', metavar='PATH', help='write results as JSON')
+    parser.add_argument('--compare', metavar='PATH',
+                        help='compare with a JSON baseline written by --save')
+    return parser.parse_args(argv)
+
+
+def setup_app(database):
+    from app import create_app, db
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': database,
+        'SECRET_KEY': os.environ.get('SECRET_KEY', 'benchmark'),
+        'TESTING': True,
+        'WTF_CSRF_ENABLED': False,
+    })
+    return app, db
+
+
+class Cases:
+    '''
+    The benchmark cases. Write cases create their own rows so that every
+    timed run does the same amount of work.
+    '''
+
+    def __init__(self, app, sizes):
+        from app.core.models import Venue, Artist
+        self.app = app
+        self.client = app.test_client()
+        self.sizes = sizes
+        self.Venue = Venue
+        self.Artist = Artist
+        self.sequence = 0
+        # Venues/artists at the end of the id range are used by deletes
+        self.venue_id = 1
+        self.artist_id = 1
+        self.deletable_venues = list(range(sizes['venues'], 1, -1))
+        self.deletable_artists = list(range(sizes['artists'], 1, -1))
+
+    def _next(self):
+        self.sequence += 1
+        return self.sequence
+
+    def venue_form_data(self):
+        n = self._next()
+        return {
+            'name': 'Benchmark Venue {}'.format(n),
+            'city': 'Benchmark City',
+            'state': 'AA',
+            'address': '{} Benchmark Street'.format(100000 + n),
+            'phone': '415-555-0100',
+            'genres': ['Jazz', 'Blues'],
+            'website': 'https://example.com',
+            'seeking_description': '',
+        }
+
+    def artist_form_data(self):
+        n = self._next()
+        return {
+            'name': 'Benchmark Artist {}'.format(n),
+            'city': 'Benchmark City',
+            'state': 'AA',
+            'phone': '415-555-0100',
+            'genres': ['Jazz', 'Blues'],
+            'seeking_description': '',
+        }
+
+    def show_form_data(self):
+        # Past the seeded shows, and a show length apart, so that
+        # bookings never conflict
+        start_time = datetime.now() + timedelta(days=800, hours=4 * self._next())
+        return {
+            'venue_id': self.venue_id,
+            'artist_id': self.artist_id,
+            'start_time': start_time.strftime('%Y-%m-%d %H:%M:%S'),
+        }
+
+    def _form(self, form_class, data):
+        from werkzeug.datastructures import MultiDict
+        return form_class(formdata=MultiDict(
+            [(key, item) for key, value in data.items()
+             for item in (value if isinstance(value, list) else [value])]))
+
+    def _new_show_id(self):
+        from app import db
+        from app.core.models import show
+        from app.core.helpers.database import DBApi
+        with self.app.test_request_context():
+            from app.core.forms import ShowForm
+            DBApi.create_show(self._form(ShowForm, self.show_form_data()))
+            return db.session.query(db.func.max(show.c.id)).scalar()
+
+    def dbapi(self):
+        from app.core.forms import VenueForm, ArtistForm, ShowForm
+        from app.core.helpers.database import DBApi
+        Venue, Artist = self.Venue, self.Artist
+        app = self.app
+
+        def in_request(function):
+            def run():
+                with app.test_request_context():
+                    return function()
+            return run
+
+        def edit(cls, form_class, data):
+            def run():
+                with app.test_request_context():
+                    DBApi.edit(cls, self._form(form_class, data()), 1)
+            return run
+
+        return [
+            ('DBApi.get_genres', in_request(DBApi.get_genres), None),
+            ('DBApi.get_states', in_request(DBApi.get_states), None),
+            ('DBApi.get_venues', in_request(DBApi.get_venues), None),
+            ('DBApi.get_artists', in_request(DBApi.get_artists), None),
+            ('DBApi.get_shows', in_request(DBApi.get_shows), None),
+            ('DBApi.get_by_id(Venue)',
+             in_request(lambda: DBApi.get_by_id(Venue, self.venue_id)), None),
+            ('DBApi.get_by_id(Artist)',
+             in_request(lambda: DBApi.get_by_id(Artist, self.artist_id)), None),
+            ('DBApi.search_venues_or_artists(Venue)',
+             in_request(lambda: DBApi.search_venues_or_artists(Venue, 'venue 1')), None),
+            ('DBApi.search_venues_or_artists(Artist)',
+             in_request(lambda: DBApi.search_venues_or_artists(Artist, 'artist 1')), None),
+            ('DBApi.find_available_venues', in_request(
+                lambda: DBApi.find_available_venues(
+                    'City 1', 'AA', datetime.now().date(), genre='Jazz')), None),
+            ('DBApi.create(Venue)', in_request(
+                lambda: DBApi.create(Venue, self._form(VenueForm, self.venue_form_data()))), None),
+            ('DBApi.create(Artist)', in_request(
+                lambda: DBApi.create(Artist, self._form(ArtistForm, self.artist_form_data()))), None),
+            ('DBApi.edit(Venue)', edit(Venue, VenueForm, lambda: dict(
+                self.venue_form_data(), address='1 Main Street', city='Edited City')), None),
+            ('DBApi.edit(Artist)', edit(Artist, ArtistForm, self.artist_form_data), None),
+            ('DBApi.create_show', in_request(
+                lambda: DBApi.create_show(self._form(ShowForm, self.show_form_data()))), None),
+            ('DBApi.delete_show', in_request(
+                lambda: DBApi.delete_show(self.pending.pop())), self._prepare_show),
+            ('DBApi.delete_venue', in_request(
+                lambda: DBApi.delete_venue(self.deletable_venues.pop(0))), None),
+            ('DBApi.delete_artist', in_request(
+                lambda: DBApi.delete_artist(self.deletable_artists.pop(0))), None),
+            ('DBApi.roll_show_counts', in_request(DBApi.roll_show_counts), None),
+        ]
+
+    def _prepare_show(self):
+        self.pending = [self._new_show_id()]
+
+    def routes(self):
+        client = self.client
+
+        def get(url, expected=200):
+            def run():
+                response = client.get(url)
+                assert response.status_code == expected, (url, response.status_code)
+            return run
+
+        def post(url, data, expected=(200, 302)):
+            def run():
+                response = client.post(url, data=data())
+                assert response.status_code in expected, (url, response.status_code)
+            return run
+
+        def delete(url):
+            def run():
+                response = client.delete(url())
+                assert response.status_code == 200, response.status_code
+            return run
+
+        venue, artist = self.venue_id, self.artist_id
+        return [
+            ('core.index', 'GET /', get('/'), None),
+            ('core.venues', 'GET /venues', get('/venues'), None),
+            ('core.search_venues', 'POST /venues/search', post(
+                '/venues/search', lambda: {'search_term': 'venue 1'}), None),
+            ('core.venue_availability', 'GET /venues/availability', get(
+                '/venues/availability?city=City+1&state=AA&genre=Jazz&date={}'.format(
+                    datetime.now().date())), None),
+            ('core.show_venue', 'GET /venues/<id>', get('/venues/{}'.format(venue)), None),
+            ('core.create_venue_form', 'GET /venues/create', get('/venues/create'), None),
+            ('core.create_venue_submission', 'POST /venues/create', post(
+                '/venues/create', self.venue_form_data), None),
+            ('core.delete_venue', 'DELETE /venues/<id>', delete(
+                lambda: '/venues/{}'.format(self.deletable_venues.pop(0))), None),
+            ('core.artists', 'GET /artists', get('/artists'), None),
+            ('core.search_artists', 'POST /artists/search', post(
+                '/artists/search', lambda: {'search_term': 'artist 1'}), None),
+            ('core.show_artist', 'GET /artists/<id>', get('/artists/{}'.format(artist)), None),
+            ('core.delete_artist', 'DELETE /artists/<id>', delete(
+                lambda: '/artists/{}'.format(self.deletable_artists.pop(0))), None),
+            ('core.edit_artist', 'GET /artists/<id>/edit', get(
+                '/artists/{}/edit'.format(artist)), None),
+            ('core.edit_artist_submission', 'POST /artists/<id>/edit', post(
+                '/artists/{}/edit'.format(artist), self.artist_form_data), None),
+            ('core.edit_venue', 'GET /venues/<id>/edit', get(
+                '/venues/{}/edit'.format(venue)), None),
+            ('core.edit_venue_submission', 'POST /venues/<id>/edit', post(
+                '/venues/{}/edit'.format(venue), lambda: dict(
+                    self.venue_form_data(), address='1 Main Street', city='Edited City')), None),
+            ('core.create_artist_form', 'GET /artists/create', get('/artists/create'), None),
+            ('core.create_artist_submission', 'POST /artists/create', post(
+                '/artists/create', self.artist_form_data), None),
+            ('core.shows', 'GET /shows', get('/shows'), None),
+            ('core.delete_show', 'DELETE /shows/<id>', delete(
+                lambda: '/shows/{}'.format(self.pending.pop())), self._prepare_show),
+            ('core.create_shows', 'GET /shows/create', get('/shows/create'), None),
+            ('core.create_show_submission', 'POST /shows/create', post(
+                '/shows/create', self.show_form_data), None),
+        ]
+
+
+def measure(function, prepare, repeat, counter):
+    timings = []
+    queries = checkouts = None
+    for _ in range(repeat):
+        if prepare is not None:
+            prepare()
+        before = counter.count, counter.checkouts
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+        if queries is None:
+            queries = counter.count - before[0]
+            checkouts = counter.checkouts - before[1]
+    return {
+        'median_ms': round(statistics.median(timings) * 1000, 3),
+        'min_ms': round(min(timings) * 1000, 3),
+        'queries': queries,
+        'checkouts': checkouts,
+    }
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as source:
+        baseline = json.load(source)['results']
+    print()
+    print('{:<44} {:>10} {:>10} {:>8} {:>9}'.format(
+        'case', 'base ms', 'now ms', 'change', 'queries'))
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if 'error' in result or (previous and 'error' in previous):
+            print('{:<44} {:>10} {:>10} {:>8}'.format(
+                name,
+                'error' if previous and 'error' in previous else '-',
+                'error' if 'error' in result else result['median_ms'], ''))
+            continue
+        if previous is None:
+            print('{:<44} {:>10} {:>10.2f} {:>8} {:>9}'.format(
+                name, '-', result['median_ms'], 'new', result['queries']))
+            continue
+        change = (result['median_ms'] - previous['median_ms']) / max(previous['median_ms'], 1e-9)
+        print('{:<44} {:>10.2f} {:>10.2f} {:>+7.0%} {:>4} -> {:<4}'.format(
+            name, previous['median_ms'], result['median_ms'], change,
+            previous['queries'], result['queries']))
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    sizes = {name: getattr(args, name) for name in DEFAULT_SIZES}
+    if args.database:
+        database = args.database
+    else:
+        directory = tempfile.mkdtemp(prefix='fyyur-bench-')
+        database = 'sqlite:///' + os.path.join(directory, 'benchmark.db')
+    app, db = setup_app(database)
+    from benchmarks.catalog import seed_catalog
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        started = time.perf_counter()
+        seed_catalog(sizes)
+        print('Seeded {} in {:.1f}s'.format(
+            ', '.join('{} {}'.format(count, name) for name, count in sizes.items()),
+            time.perf_counter() - started))
+
+    counter = QueryCounter()
+    cases = Cases(app, sizes)
+    route_cases = cases.routes()
+    covered = {endpoint for endpoint, _, _, _ in route_cases}
+    missing = sorted(
+        rule.endpoint for rule in app.url_map.iter_rules()
+        if rule.endpoint.startswith('core.') and rule.endpoint not in covered)
+    if missing:
+        print('Routes without a benchmark case: ' + ', '.join(missing), file=sys.stderr)
+
+    all_cases = cases.dbapi() + [
+        (name, function, prepare) for _, name, function, prepare in route_cases]
+    results = {}
+    for name, function, prepare in all_cases:
+        if args.only and args.only not in name:
+            continue
+        try:
+            # Every case pushes its own request context, so that sessions
+            # and connections are released as they would be in production
+            result = measure(function, prepare, args.repeat, counter)
+        except Exception as error:
+            # Keep going so one broken case does not hide the others
+            results[name] = {'error': '{}: {}'.format(type(error).__name__, error)}
+            print('{:<44} FAILED {}'.format(name, results[name]['error'][:200]))
+            continue
+        results[name] = result
+        print('{:<44} {:>9.2f} ms {:>6} queries {:>3} checkouts'.format(
+            name, result['median_ms'], result['queries'], result['checkouts']))
+
+    if args.compare:
+        compare(results, args.compare)
+    if args.save:
+        with open(args.save, 'w') as target:
+            json.dump({
+                'meta': {
+                    'created': datetime.now().isoformat(timespec='seconds'),
+                    'python': platform.python_version(),
+                    'database': db.engine.dialect.name,
+                    'sizes': sizes,
+                    'repeat': args.repeat,
+                },
+                'results': results,
+            }, target, indent=2, sort_keys=True)
+        print('Saved results to ' + args.save)
+
+
+if __name__ == '__main__':
+    main()
@@ -9,3 +9,151 @@ DEBUG = True
 # Connect to the database
 SQLALCHEMY_DATABASE_URI = os.getenv('SQLALCHEMY_DATABASE_URI')
 SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+# Read replicas, comma-separated. Read-only DBApi methods called while
+# serving GET requests are spread over them round-robin.
+SQLALCHEMY_REPLICA_URIS = [
+    uri.strip() for uri in os.getenv('SQLALCHEMY_REPLICA_URIS', '').split(',')
+    if uri.strip()
+]
+# Seconds a replica that failed is left out before it is tried again
+DB_REPLICA_RETRY = int(os.getenv('DB_REPLICA_RETRY', 30))
+# Seconds after a write during which the writing client reads from the
+# primary; keep it above the usual replication lag
+READ_YOUR_WRITES = int(os.getenv('READ_YOUR_WRITES', 5))
+
+# Connection pool. Size, overflow and timeout only apply to server
+# databases; SQLite connections are not pooled by a QueuePool.
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 10))
+# Seconds a request waits for a free connection before giving up (503)
+DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', 30))
+# Seconds a client answered with that 503 is asked to wait (Retry-After)
+DB_POOL_RETRY_AFTER = int(os.getenv('DB_POOL_RETRY_AFTER', 5))
+# Seconds after which a connection is replaced; keep it below the idle
+# timeout of the server and of any proxy in between
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))
+# Test connections on checkout, replacing ones the server has dropped
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true'
+# Milliseconds a single statement may run before it is cancelled (0 = no limit)
+DB_STATEMENT_TIMEOUT = int(os.getenv('DB_STATEMENT_TIMEOUT', 30000))
+
+
+# SQLALCHEMY_BINDS and SQLALCHEMY_ENGINE_OPTIONS are derived from the settings
+# above by create_app, once its overrides have been applied
+def replica_binds(config):
+    return {
+        'replica_{}'.format(n): uri
+        for n, uri in enumerate(config['SQLALCHEMY_REPLICA_URIS'])
+    }
+
+
+def engine_options(config):
+    uri = config['SQLALCHEMY_DATABASE_URI'] or ''
+    options = {
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+    }
+    if not uri.startswith('sqlite'):
+        options.update({
+            'pool_size': config['DB_POOL_SIZE'],
+            'max_overflow': config['DB_MAX_OVERFLOW'],
+            'pool_timeout': config['DB_POOL_TIMEOUT'],
+        })
+    if uri.startswith('postgres') and config['DB_STATEMENT_TIMEOUT']:
+        # Set by the server for every new connection
+        options['connect_args'] = {
+            'options': '-c statement_timeout={}'.format(config['DB_STATEMENT_TIMEOUT'])
+        }
+    return options
+
+
+# Number of rows per page on the /venues, /artists and /shows listings
+PAGE_SIZE = int(os.getenv('PAGE_SIZE', 50))
+
+# Upper bound on the ?limit accepted by the JSON API
+API_MAX_PAGE_SIZE = int(os.getenv('API_MAX_PAGE_SIZE', 500))
+
+# Maximum number of results returned per search page
+SEARCH_PAGE_SIZE = int(os.getenv('SEARCH_PAGE_SIZE', 20))
+
+# Seconds that cached Genre/State reference data is served before reloading
+REFERENCE_DATA_TTL = int(os.getenv('REFERENCE_DATA_TTL', 300))
+
+# Share one session per request and commit it once when the response is
+# ready, instead of a session (and connection checkout) per DBApi call
+REQUEST_SCOPED_SESSION = os.getenv('REQUEST_SCOPED_SESSION', 'true').lower() == 'true'
+
+# Length assumed for every show when checking bookings for double-booking
+SHOW_DURATION_MINUTES = int(os.getenv('SHOW_DURATION_MINUTES', 180))
+
+# Most shows a single recurring booking can create
+MAX_RECURRING_SHOWS = int(os.getenv('MAX_RECURRING_SHOWS', 200))
+
+# Flag deleted venues and artists instead of removing their rows; flagged
+# rows are hidden everywhere and can be removed with `flask core purge-deleted`
+SOFT_DELETE = os.getenv('SOFT_DELETE', 'false').lower() == 'true'
+
+# Background tasks run after a write commits: worker threads (0 runs each
+# task before the response is sent), the most tasks waiting before writers
+# run them themselves, attempts after a failure with a doubling delay
+# (seconds), and seconds to finish queued tasks on shutdown
+TASK_WORKERS = int(os.getenv('TASK_WORKERS', 2))
+TASK_QUEUE_SIZE = int(os.getenv('TASK_QUEUE_SIZE', 1000))
+TASK_RETRIES = int(os.getenv('TASK_RETRIES', 3))
+TASK_RETRY_BACKOFF = float(os.getenv('TASK_RETRY_BACKOFF', 0.5))
+TASK_DRAIN_TIMEOUT = int(os.getenv('TASK_DRAIN_TIMEOUT', 30))
+
+# Fingerprinted static assets written by `flask core build-assets`; used
+# when the directory holds a build, served with a far-future max-age
+ASSETS_BUILD_DIR = os.getenv('ASSETS_BUILD_DIR', os.path.join(BASE_DIR, 'build', 'static'))
+ASSETS_FINGERPRINT = os.getenv('ASSETS_FINGERPRINT', 'true').lower() == 'true'
+ASSETS_MAX_AGE = int(os.getenv('ASSETS_MAX_AGE', 365 * 24 * 3600))
+
+# Compress HTML, JSON and other text responses with brotli or gzip, as the
+# client prefers; smaller responses (bytes) are sent as they are. Brotli
+# levels go up to 11, but past 5 cost much more CPU for little gain.
+COMPRESS_ENABLED = os.getenv('COMPRESS_ENABLED', 'true').lower() == 'true'
+COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', 1024))
+COMPRESS_LEVEL = int(os.getenv('COMPRESS_LEVEL', 6))
+COMPRESS_BROTLI_LEVEL = int(os.getenv('COMPRESS_BROTLI_LEVEL', 4))
+COMPRESS_MIMETYPES = {
+    'text/html', 'text/css', 'text/plain', 'text/xml', 'text/csv',
+    'application/json', 'application/javascript', 'application/xml',
+    'image/svg+xml',
+}
+
+# Number of rendered venue/artist detail pages kept in memory per process
+DETAIL_PAGE_CACHE_SIZE = int(os.getenv('DETAIL_PAGE_CACHE_SIZE', 1024))
+
+# Log a per-request SQL summary (query count, DB time, slowest statement)
+SQL_INSTRUMENTATION_LOG = os.getenv('SQL_INSTRUMENTATION_LOG', 'true').lower() == 'true'
+
+# Maximum number of SQL statements per request, by endpoint. Requests over
+# budget are logged, or raise QueryBudgetExceeded and roll back when
+# QUERY_BUDGET_MODE is 'raise'.
+QUERY_BUDGETS = {
+    'core.venues': 2,
+    'core.artists': 2,
+    'core.shows': 2,
+    'core.search_venues': 2,
+    'core.search_artists': 2,
+    'core.venue_availability': 6,
+    'core.show_venue': 8,
+    'core.show_artist': 8,
+    'core.edit_venue': 10,
+    'core.edit_artist': 10,
+    'core.create_venue_form': 2,
+    'core.create_artist_form': 2,
+    'core.create_venue_submission': 12,
+    'core.create_artist_submission': 12,
+    'core.edit_venue_submission': 16,
+    'core.edit_artist_submission': 16,
+    'core.create_show_submission': 8,
+}
+QUERY_BUDGET_DEFAULT = None
+QUERY_BUDGET_MODE = os.getenv('QUERY_BUDGET_MODE', 'log')
+
+# Serve Prometheus metrics at /metrics. With several worker processes set
+# the prometheus_multiproc_dir environment variable to a shared directory.
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
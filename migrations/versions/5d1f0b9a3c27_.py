@@ -0,0 +1,36 @@
+"""add show, address and city lookup indexes
+
+Revision ID: 5d1f0b9a3c27
+Revises: 214c6cf5d401
+Create Date: 2026-10-18 10:12:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d1f0b9a3c27'
+down_revision = '214c6cf5d401'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_show_venue_id_start_time', 'Show', ['venue_id', 'start_time'], unique=False)
+    op.create_index('ix_show_artist_id_start_time', 'Show', ['artist_id', 'start_time'], unique=False)
+    op.create_index('ix_show_start_time', 'Show', ['start_time'], unique=False)
+    op.create_index(
+        'ix_city_lower_name_state_id', 'City',
+        [sa.text('lower(name)'), 'state_id'], unique=False)
+    op.create_index(
+        'ix_address_lower_street_house_number_city_id', 'Address',
+        [sa.text('lower(street)'), 'house_number', 'city_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_address_lower_street_house_number_city_id', table_name='Address')
+    op.drop_index('ix_city_lower_name_state_id', table_name='City')
+    op.drop_index('ix_show_start_time', table_name='Show')
+    op.drop_index('ix_show_artist_id_start_time', table_name='Show')
+    op.drop_index('ix_show_venue_id_start_time', table_name='Show')
@@ -0,0 +1,30 @@
+"""add keyset pagination indexes
+
+Revision ID: 9b7e4c2d8a15
+Revises: 5d1f0b9a3c27
+Create Date: 2026-10-18 11:02:09.528117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b7e4c2d8a15'
+down_revision = '5d1f0b9a3c27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.drop_index('ix_show_start_time', table_name='Show')
+    op.create_index('ix_show_start_time_id', 'Show', ['start_time', 'id'], unique=False)
+    op.create_index('ix_artist_updated_at_id', 'Artist', ['updated_at', 'id'], unique=False)
+    op.create_index('ix_address_city_id_venue_id', 'Address', ['city_id', 'venue_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_address_city_id_venue_id', table_name='Address')
+    op.drop_index('ix_artist_updated_at_id', table_name='Artist')
+    op.drop_index('ix_show_start_time_id', table_name='Show')
+    op.create_index('ix_show_start_time', 'Show', ['start_time'], unique=False)
@@ -0,0 +1,25 @@
+"""drop the artist (updated_at, id) index
+
+Revision ID: a41c7e9d2b58
+Revises: f7c2d90e4b13
+Create Date: 2026-10-18 16:21:47.209316
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a41c7e9d2b58'
+down_revision = 'f7c2d90e4b13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The artist listing is paged by id now
+    op.drop_index('ix_artist_updated_at_id', table_name='Artist')
+
+
+def downgrade():
+    op.create_index('ix_artist_updated_at_id', 'Artist', ['updated_at', 'id'], unique=False)
@@ -0,0 +1,31 @@
+"""add the import progress table
+
+Revision ID: c82e5f1a9d36
+Revises: a41c7e9d2b58
+Create Date: 2026-10-18 16:48:05.551902
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c82e5f1a9d36'
+down_revision = 'a41c7e9d2b58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'ImportProgress',
+        sa.Column('source', sa.String(length=500), nullable=False),
+        sa.Column('kind', sa.String(length=20), nullable=False),
+        sa.Column('records', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('source', 'kind')
+    )
+
+
+def downgrade():
+    op.drop_table('ImportProgress')
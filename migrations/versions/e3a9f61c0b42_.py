@@ -0,0 +1,66 @@
+"""add maintained show counts to venues and artists
+
+Revision ID: e3a9f61c0b42
+Revises: 9b7e4c2d8a15
+Create Date: 2026-10-18 11:48:33.104925
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3a9f61c0b42'
+down_revision = '9b7e4c2d8a15'
+branch_labels = None
+depends_on = None
+
+
+show = sa.table(
+    'Show',
+    sa.column('id', sa.Integer),
+    sa.column('venue_id', sa.Integer),
+    sa.column('artist_id', sa.Integer),
+    sa.column('start_time', sa.DateTime))
+
+
+def _backfill(table_name, show_fk):
+    table = sa.table(
+        table_name,
+        sa.column('id', sa.Integer),
+        sa.column('upcoming_shows_count', sa.Integer),
+        sa.column('past_shows_count', sa.Integer),
+        sa.column('next_show_time', sa.DateTime))
+    now = datetime.now()
+
+    def shows_where(column, condition):
+        return sa.select([column]).where(
+            sa.and_(show_fk == table.c.id, condition)).as_scalar()
+
+    op.execute(table.update().values(
+        upcoming_shows_count=shows_where(
+            sa.func.count(show.c.id), show.c.start_time > now),
+        past_shows_count=shows_where(
+            sa.func.count(show.c.id), show.c.start_time <= now),
+        next_show_time=shows_where(
+            sa.func.min(show.c.start_time), show.c.start_time > now)))
+
+
+def upgrade():
+    for table_name in ('Venue', 'Artist'):
+        op.add_column(table_name, sa.Column('upcoming_shows_count', sa.Integer(), server_default='0', nullable=False))
+        op.add_column(table_name, sa.Column('past_shows_count', sa.Integer(), server_default='0', nullable=False))
+        op.add_column(table_name, sa.Column('next_show_time', sa.DateTime(), nullable=True))
+        op.create_index(op.f('ix_{}_next_show_time'.format(table_name)), table_name, ['next_show_time'], unique=False)
+    _backfill('Venue', show.c.venue_id)
+    _backfill('Artist', show.c.artist_id)
+
+
+def downgrade():
+    for table_name in ('Artist', 'Venue'):
+        op.drop_index(op.f('ix_{}_next_show_time'.format(table_name)), table_name=table_name)
+        op.drop_column(table_name, 'next_show_time')
+        op.drop_column(table_name, 'past_shows_count')
+        op.drop_column(table_name, 'upcoming_shows_count')
@@ -0,0 +1,57 @@
+"""cascade venue and artist deletes, add soft-delete flags
+
+Revision ID: f7c2d90e4b13
+Revises: e3a9f61c0b42
+Create Date: 2026-10-18 14:05:12.730418
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f7c2d90e4b13'
+down_revision = 'e3a9f61c0b42'
+branch_labels = None
+depends_on = None
+
+
+# (table, column, referenced table) of the rows owned by a venue or artist
+OWNED = [
+    ('Show', 'venue_id', 'Venue'),
+    ('Show', 'artist_id', 'Artist'),
+    ('GenreVenue', 'venue_id', 'Venue'),
+    ('GenreArtist', 'artist_id', 'Artist'),
+]
+
+
+def upgrade():
+    for table, column, referred in OWNED:
+        name = '{}_{}_fkey'.format(table, column)
+        op.drop_constraint(name, table, type_='foreignkey')
+        op.create_foreign_key(name, table, referred, [column], ['id'], ondelete='CASCADE')
+    op.drop_constraint('Address_venue_id_fkey', 'Address', type_='foreignkey')
+    op.create_foreign_key(
+        'Address_venue_id_fkey', 'Address', 'Venue', ['venue_id'], ['id'],
+        onupdate='CASCADE', ondelete='CASCADE')
+
+    op.add_column('Venue', sa.Column('deleted', sa.Boolean(), server_default=sa.false(), nullable=False))
+    op.add_column('Artist', sa.Column('deleted', sa.Boolean(), server_default=sa.false(), nullable=False))
+    op.create_index(op.f('ix_Venue_deleted'), 'Venue', ['deleted'], unique=False)
+    op.create_index(op.f('ix_Artist_deleted'), 'Artist', ['deleted'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_Artist_deleted'), table_name='Artist')
+    op.drop_index(op.f('ix_Venue_deleted'), table_name='Venue')
+    op.drop_column('Artist', 'deleted')
+    op.drop_column('Venue', 'deleted')
+
+    op.drop_constraint('Address_venue_id_fkey', 'Address', type_='foreignkey')
+    op.create_foreign_key(
+        'Address_venue_id_fkey', 'Address', 'Venue', ['venue_id'], ['id'],
+        onupdate='CASCADE')
+    for table, column, referred in OWNED:
+        name = '{}_{}_fkey'.format(table, column)
+        op.drop_constraint(name, table, type_='foreignkey')
+        op.create_foreign_key(name, table, referred, [column], ['id'])
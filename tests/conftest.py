@@ -0,0 +1,69 @@
+import pytest
+
+from app import create_app, db
+from app.core.models import Address, Artist, City, Genre, State, Venue
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    '''
+    Create an application on a fresh SQLite file with the given settings.
+    '''
+    def make(**overrides):
+        config = {
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'fyyur.db'),
+            'SECRET_KEY': 'test',
+            'TESTING': True,
+            'WTF_CSRF_ENABLED': False,
+            'SQL_INSTRUMENTATION_LOG': False,
+            # Background tasks run before the response is sent
+            'TASK_WORKERS': 0,
+        }
+        config.update(overrides)
+        app = create_app(config)
+        with app.app_context():
+            db.create_all()
+        return app
+    return make
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+@pytest.fixture
+def catalog(app):
+    '''
+    Two venues and two artists in San Francisco; returns their ids.
+    '''
+    with app.app_context():
+        state = State(name='California', code='CA')
+        jazz, rock = Genre(name='Jazz'), Genre(name='Rock')
+        db.session.add_all([state, jazz, rock])
+        db.session.flush()
+        city = City(name='San Francisco', state_id=state.id)
+        db.session.add(city)
+        db.session.flush()
+        venues = [
+            Venue(name='Venue {}'.format(n), genres=[jazz, rock][n - 1:n])
+            for n in (1, 2)
+        ]
+        artists = [
+            Artist(name='Artist {}'.format(n), city_id=city.id, genres=[jazz])
+            for n in (1, 2)
+        ]
+        db.session.add_all(venues + artists)
+        db.session.flush()
+        db.session.add_all([
+            Address(house_number=n, street='Main St', city_id=city.id, venue_id=venue.id)
+            for n, venue in enumerate(venues, 1)
+        ])
+        db.session.commit()
+        ids = {
+            'city_id': city.id,
+            'venues': [venue.id for venue in venues],
+            'artists': [artist.id for artist in artists],
+        }
+        db.session.remove()
+    return ids
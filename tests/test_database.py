@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.core.helpers.database import DBApi
+from app.core.models import Venue
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app(SOFT_DELETE=True)
+
+
+def test_soft_deleted_artist_frees_the_venue(app, catalog):
+    (venue_id, _), (artist_id, deleted_artist_id) = catalog['venues'], catalog['artists']
+    start_time = datetime.now().replace(hour=20, minute=0, second=0, microsecond=0) \
+        + timedelta(days=30)
+    with app.app_context():
+        DBApi.book_shows(venue_id, deleted_artist_id, [start_time])
+        db.session.commit()
+        DBApi.delete_artist(deleted_artist_id)
+
+        available = DBApi.find_available_venues('San Francisco', 'CA', start_time.date())
+        assert venue_id in [venue['id'] for venue in available['data']]
+        assert DBApi.find_show_conflicts(venue_id, artist_id, [start_time]) == []
+        DBApi.book_shows(venue_id, artist_id, [start_time])
+        db.session.commit()
+
+
+def venue_form(name, address='1 Main St'):
+    return {
+        'name': name,
+        'city': 'San Francisco',
+        'state': 'CA',
+        'address': address,
+        'phone': '415-555-0100',
+        'genres': ['Jazz'],
+    }
+
+
+def test_soft_deleted_venue_frees_its_address(app, catalog):
+    client = app.test_client()
+    assert client.delete('/venues/{}'.format(catalog['venues'][0])).status_code == 200
+    response = client.post('/venues/create', data=venue_form('Venue New'), follow_redirects=True)
+    assert 'Venue New was successfully listed' in response.get_data(as_text=True)
+    with app.app_context():
+        venue = Venue.query.filter_by(name='Venue New').one()
+        assert (venue.address.house_number, venue.address.street) == (1, 'Main St')
+        db.session.remove()
+
+
+def test_soft_deleted_venue_cannot_be_edited(app, catalog):
+    venue_id = catalog['venues'][0]
+    client = app.test_client()
+    assert client.delete('/venues/{}'.format(venue_id)).status_code == 200
+    response = client.post('/venues/{}/edit'.format(venue_id), data=venue_form('Venue Renamed'))
+    assert response.status_code == 200
+    assert 'Venue Venue Renamed could not be updated' in response.get_data(as_text=True)
+    with app.app_context():
+        assert Venue.query.get(venue_id).name == 'Venue 1'
+        db.session.remove()
@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+
+from werkzeug.http import http_date
+
+from app import db
+from app.core.helpers.database import DBApi
+from app.core.models import Artist, Venue
+
+
+def updated_at(app, cls, _id):
+    with app.app_context():
+        value = db.session.query(cls.updated_at).filter(cls.id == _id).scalar()
+        db.session.remove()
+    return value
+
+
+def test_show_counts_leave_updated_at_alone(app, catalog):
+    venue_id, artist_id = catalog['venues'][0], catalog['artists'][0]
+    before = updated_at(app, Venue, venue_id), updated_at(app, Artist, artist_id)
+    with app.app_context():
+        DBApi.book_shows(venue_id, artist_id, [datetime.now() + timedelta(days=1)])
+        db.session.commit()
+        DBApi.roll_show_counts(rebuild=True)
+    assert (updated_at(app, Venue, venue_id), updated_at(app, Artist, artist_id)) == before
+
+
+def test_etag_follows_show_counts(app, catalog):
+    venue_id, artist_id = catalog['venues'][0], catalog['artists'][0]
+    client = app.test_client()
+    etag, _ = client.get('/venues/{}'.format(venue_id)).get_etag()
+    assert client.get('/venues/{}'.format(venue_id),
+                      headers={'If-None-Match': 'W/"{}"'.format(etag)}).status_code == 304
+
+    with app.app_context():
+        DBApi.book_shows(venue_id, artist_id, [datetime.now() + timedelta(days=1)])
+        db.session.commit()
+    response = client.get('/venues/{}'.format(venue_id),
+                          headers={'If-None-Match': 'W/"{}"'.format(etag)})
+    assert response.status_code == 200
+    assert response.get_etag()[0] != etag
+    assert b'Artist 1' in response.get_data()
+
+
+def test_edits_within_a_second_are_not_304(app, catalog):
+    venue_id = catalog['venues'][0]
+    client = app.test_client()
+    response = client.get('/venues/{}'.format(venue_id))
+    assert 'Last-Modified' not in response.headers
+
+    with app.app_context():
+        venue = Venue.query.get(venue_id)
+        venue.name = 'Renamed Venue'
+        venue.updated_at += timedelta(milliseconds=1)
+        db.session.commit()
+        seen_at = venue.updated_at + timedelta(seconds=1)
+        db.session.remove()
+    response = client.get('/venues/{}'.format(venue_id),
+                          headers={'If-Modified-Since': http_date(seen_at)})
+    assert response.status_code == 200
+    assert b'Renamed Venue' in response.get_data()
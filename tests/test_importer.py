@@ -0,0 +1,47 @@
+import pytest
+
+from app import db
+from app.core.helpers.importer import BulkImporter, BulkImportError
+from app.core.models import Artist, ImportProgress
+
+
+def write_artists(path, states):
+    path.write_text('name,city,state,genres\n' + ''.join(
+        'Imported {},San Francisco,{},Jazz\n'.format(n, state)
+        for n, state in enumerate(states, 1)))
+
+
+def imported(app):
+    with app.app_context():
+        names = [row.name for row in db.session.query(Artist.name).filter(
+            Artist.name.like('Imported %'))]
+        progress = [row.records for row in db.session.query(ImportProgress.records)]
+        db.session.remove()
+    return sorted(names), progress
+
+
+def test_resumed_import_adds_each_record_once(app, catalog, tmp_path):
+    path = tmp_path / 'artists.csv'
+    write_artists(path, ['CA', 'CA', 'CA', 'ZZ', 'CA'])
+    importer = BulkImporter('artists', batch_size=2, report=lambda message: None)
+    with app.app_context(), pytest.raises(BulkImportError):
+        importer.run(str(path))
+    assert imported(app) == (['Imported 1', 'Imported 2'], [2])
+
+    write_artists(path, ['CA'] * 5)
+    with app.app_context():
+        assert importer.run(str(path)) == 3
+    assert imported(app) == (['Imported {}'.format(n) for n in range(1, 6)], [])
+
+
+def test_progress_commits_with_its_batch(app, catalog, tmp_path, monkeypatch):
+    path = tmp_path / 'artists.csv'
+    write_artists(path, ['CA', 'CA'])
+    importer = BulkImporter('artists', batch_size=2, report=lambda message: None)
+
+    def fail(source, records):
+        raise RuntimeError('crashed before the commit')
+    monkeypatch.setattr(importer, '_save_progress', fail)
+    with app.app_context(), pytest.raises(BulkImportError):
+        importer.run(str(path))
+    assert imported(app) == ([], [])
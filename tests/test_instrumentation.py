@@ -0,0 +1,36 @@
+from datetime import datetime, timedelta
+
+from app import db
+from app.core.models import show
+
+
+def create_show(app, catalog):
+    start_time = datetime.now().replace(microsecond=0) + timedelta(days=7)
+    return app.test_client().post('/shows/create', data={
+        'venue_id': catalog['venues'][0],
+        'artist_id': catalog['artists'][0],
+        'start_time': start_time.strftime('%Y-%m-%d %H:%M:%S'),
+    })
+
+
+def show_count(app):
+    with app.app_context():
+        count = db.session.query(show).count()
+        db.session.remove()
+    return count
+
+
+def test_request_over_budget_is_logged_by_default(make_app, catalog, caplog):
+    app = make_app(QUERY_BUDGETS={'core.create_show_submission': 1})
+    assert app.debug
+    assert create_show(app, catalog).status_code == 200
+    assert 'Query budget exceeded for core.create_show_submission' in caplog.text
+    assert show_count(app) == 1
+
+
+def test_request_over_budget_is_rolled_back_in_raise_mode(make_app, catalog):
+    app = make_app(
+        QUERY_BUDGETS={'core.create_show_submission': 1}, QUERY_BUDGET_MODE='raise',
+        PROPAGATE_EXCEPTIONS=False, PRESERVE_CONTEXT_ON_EXCEPTION=False)
+    assert create_show(app, catalog).status_code == 500
+    assert show_count(app) == 0
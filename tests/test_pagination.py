@@ -0,0 +1,37 @@
+from datetime import datetime
+
+import pytest
+
+from app import db
+from app.core.helpers.pagination import encode_cursor
+from app.core.models import Artist
+
+
+@pytest.mark.parametrize('cursor', [
+    'NQ',                                   # 5
+    'bnVsbA',                               # null
+    'not a cursor!',
+    encode_cursor([1]),                     # one value, shows take two
+    encode_cursor(['2030-01-01T20:00:00', 'x']),
+    encode_cursor(['yesterday', 1]),
+])
+def test_bad_cursor_is_a_400(app, catalog, cursor):
+    response = app.test_client().get('/api/v1/shows', query_string={'cursor': cursor})
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Invalid pagination cursor supplied'
+
+
+def test_artist_pages_survive_edits(app, catalog):
+    client = app.test_client()
+    first = client.get('/api/v1/artists?limit=1').get_json()
+    # The artist of the next page changes after the first page was read
+    with app.app_context():
+        artist = Artist.query.get(first['data'][0]['id'] - 1)
+        artist.updated_at = datetime.now()
+        db.session.commit()
+        db.session.remove()
+
+    second = client.get('/api/v1/artists', query_string={
+        'limit': 1, 'cursor': first['next_cursor']}).get_json()
+    seen = [item['id'] for item in first['data'] + second['data']]
+    assert sorted(seen) == sorted(catalog['artists'])
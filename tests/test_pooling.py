@@ -0,0 +1,53 @@
+import logging
+
+import pytest
+from sqlalchemy.pool import QueuePool
+
+from app import db
+
+
+@pytest.fixture
+def app(make_app):
+    # One connection, given up on after 0.1s; the config's DB_MAX_OVERFLOW
+    # doesn't apply to this pool
+    return make_app(SQLALCHEMY_ENGINE_OPTIONS={
+        'poolclass': QueuePool,
+        'pool_size': 1,
+        'max_overflow': 0,
+        'pool_timeout': 0.1,
+    })
+
+
+@pytest.fixture
+def exhausted(app, catalog):
+    with app.app_context():
+        connection = db.engine.connect()
+    yield
+    connection.close()
+
+
+@pytest.mark.parametrize('url', [
+    '/venues',
+    '/artists/1',
+    '/venues/availability?city=San+Francisco&state=CA&date=2030-01-01',
+])
+def test_pool_timeout_answers_503(app, exhausted, url):
+    response = app.test_client().get(url)
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == str(app.config['DB_POOL_RETRY_AFTER'])
+    assert response.mimetype == 'text/html'
+
+
+def test_api_pool_timeout_answers_json(app, exhausted):
+    response = app.test_client().get('/api/v1/venues')
+    assert response.status_code == 503
+    assert 'Retry-After' in response.headers
+    assert 'error' in response.get_json()
+
+
+def test_exhaustion_is_logged(app, caplog):
+    with caplog.at_level(logging.WARNING, logger=app.logger.name):
+        with app.app_context():
+            connection = db.engine.connect()
+        connection.close()
+    assert any('Connection pool exhausted' in record.message for record in caplog.records)
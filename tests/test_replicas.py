@@ -0,0 +1,69 @@
+import shutil
+
+import pytest
+
+from app import db
+from app.core.models import Venue
+
+
+@pytest.fixture
+def replicas(tmp_path):
+    return [str(tmp_path / 'replica-{}.db'.format(n)) for n in range(2)]
+
+
+@pytest.fixture
+def app(make_app, replicas):
+    return make_app(SQLALCHEMY_REPLICA_URIS=['sqlite:///' + path for path in replicas])
+
+
+def replicate(app, path):
+    # A copy of the primary stands in for a replica that has caught up to now
+    shutil.copy(app.config['SQLALCHEMY_DATABASE_URI'][len('sqlite:///'):], path)
+
+
+def rename_venue(app, venue_id, name):
+    with app.app_context():
+        venue = Venue.query.get(venue_id)
+        venue.name = name
+        db.session.commit()
+        updated_at = venue.updated_at
+        db.session.remove()
+    return updated_at
+
+
+def test_detail_page_reads_one_replica(app, catalog, replicas):
+    venue_id = catalog['venues'][0]
+    with app.app_context():
+        old_version = Venue.query.get(venue_id).updated_at
+        db.session.remove()
+    replicate(app, replicas[0])
+    new_version = rename_venue(app, venue_id, 'Renamed Venue')
+    replicate(app, replicas[1])
+
+    client = app.test_client()
+    served = {}
+    for _ in range(4):
+        response = client.get('/venues/{}'.format(venue_id))
+        assert response.status_code == 200
+        etag, _ = response.get_etag()
+        served.setdefault(etag, set()).add(b'Renamed Venue' in response.get_data())
+
+    # Both replicas served pages, and each page matches the updated_at of
+    # its venue-<id>-<updated_at>-... ETag
+    assert {etag.split('-')[2]: renamed for etag, renamed in served.items()} == {
+        str(old_version.timestamp()): {False},
+        str(new_version.timestamp()): {True},
+    }
+
+
+def test_failed_replica_falls_back_to_primary(make_app, tmp_path):
+    missing = tmp_path / 'gone'
+    missing.mkdir()
+    app = make_app(SQLALCHEMY_REPLICA_URIS=['sqlite:///' + str(missing / 'replica.db')])
+    shutil.rmtree(str(missing))
+
+    response = app.test_client().get('/venues')
+    assert response.status_code == 200
+    assert b'Oops' not in response.get_data()
+    # Left out until DB_REPLICA_RETRY has passed
+    assert app.extensions['replicas'].choose() is None
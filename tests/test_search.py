@@ -0,0 +1,5 @@
+def test_search_reports_page_size(app, catalog):
+    app.config['SEARCH_PAGE_SIZE'] = 1
+    response = app.test_client().post('/venues/search', data={'search_term': 'Venue'})
+    assert response.status_code == 200
+    assert b'Search results for "Venue": 1 on this page, more below' in response.get_data()
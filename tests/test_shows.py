@@ -0,0 +1,40 @@
+from datetime import datetime, timedelta
+
+from app import db
+from app.core.models import show
+
+
+def test_recurrence_ending_before_the_first_show_is_rejected(app, catalog):
+    start_time = datetime.now().replace(microsecond=0) + timedelta(days=7)
+    response = app.test_client().post('/shows/create', data={
+        'venue_id': catalog['venues'][0],
+        'artist_id': catalog['artists'][0],
+        'start_time': start_time.strftime('%Y-%m-%d %H:%M:%S'),
+        'repeat': 'weekly',
+        'interval': 1,
+        'until': (start_time - timedelta(days=1)).strftime('%Y-%m-%d'),
+    })
+    assert response.status_code == 200
+    page = response.get_data(as_text=True)
+    assert 'Until - The end date is before the first show' in page
+    assert 'An error occurred' not in page
+    with app.app_context():
+        assert db.session.query(show).count() == 0
+
+
+def test_unparsable_until_is_a_field_error(app, catalog):
+    start_time = datetime.now().replace(microsecond=0) + timedelta(days=7)
+    response = app.test_client().post('/shows/create', data={
+        'venue_id': catalog['venues'][0],
+        'artist_id': catalog['artists'][0],
+        'start_time': start_time.strftime('%Y-%m-%d %H:%M:%S'),
+        'repeat': 'weekly',
+        'interval': 1,
+        'until': 'garbage',
+    })
+    assert response.status_code == 200
+    page = response.get_data(as_text=True)
+    assert 'Until - Not a valid date value' in page
+    assert 'An error occurred' not in page
+    with app.app_context():
+        assert db.session.query(show).count() == 0
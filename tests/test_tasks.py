@@ -0,0 +1,53 @@
+import threading
+
+from prometheus_client import REGISTRY
+
+
+def queue_depth():
+    return REGISTRY.get_sample_value('fyyur_task_queue_depth')
+
+
+def test_queue_depth_counts_a_task_before_a_worker_takes_it(make_app):
+    app = make_app(TASK_WORKERS=1, TASK_QUEUE_SIZE=1)
+    executor = app.extensions['tasks']
+    baseline = queue_depth()
+    seen, taken = [], threading.Event()
+
+    def task():
+        seen.append(queue_depth() - baseline)
+        taken.set()
+
+    # The worker takes the task off the queue before submit() returns
+    put_nowait = executor._queue.put_nowait
+
+    def put_and_wait(item):
+        put_nowait(item)
+        taken.wait(5)
+    executor._queue.put_nowait = put_and_wait
+
+    executor.submit(task)
+    executor.shutdown(5)
+    assert seen == [0]
+    assert queue_depth() == baseline
+
+
+def test_full_queue_leaves_queue_depth_unchanged(make_app):
+    app = make_app(TASK_WORKERS=1, TASK_QUEUE_SIZE=1)
+    executor = app.extensions['tasks']
+    baseline = queue_depth()
+    started, release, ran = threading.Event(), threading.Event(), []
+
+    def block():
+        started.set()
+        release.wait(5)
+
+    executor.submit(block)
+    started.wait(5)
+    executor.submit(ran.append, 'queued')
+    # The queue is full, so this one runs in the caller
+    executor.submit(ran.append, 'caller')
+    assert ran == ['caller']
+    release.set()
+    executor.shutdown(5)
+    assert ran == ['caller', 'queued']
+    assert queue_depth() == baseline
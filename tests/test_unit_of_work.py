@@ -0,0 +1,31 @@
+from flask import has_request_context
+from sqlalchemy.orm import Session
+
+from app import db
+from app.core.models import Artist
+
+
+def test_failed_commit_drops_the_success_message(app, catalog, monkeypatch):
+    artist_id = catalog['artists'][0]
+    commit = Session.commit
+
+    def fail_in_requests(session):
+        if has_request_context():
+            raise RuntimeError('commit failed')
+        commit(session)
+    monkeypatch.setattr(Session, 'commit', fail_in_requests)
+
+    client = app.test_client()
+    response = client.post('/artists/{}/edit'.format(artist_id), data={
+        'name': 'Artist Renamed',
+        'city': 'San Francisco',
+        'state': 'CA',
+        'phone': '415-555-0100',
+        'genres': ['Jazz'],
+    })
+    assert response.status_code == 500
+    assert b'successfully updated' not in response.get_data()
+    assert b'successfully updated' not in client.get('/').get_data()
+    with app.app_context():
+        assert Artist.query.get(artist_id).name == 'Artist 1'
+        db.session.remove()